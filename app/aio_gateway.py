@@ -0,0 +1,255 @@
+import ssl
+import time
+import asyncio
+import threading
+from urllib.parse import urlsplit
+from .compression import ZlibStreamInflator
+from .reconnect import CLOSE_NORMAL, CLOSE_RESUMABLE
+from .wsproto import (
+    ConnectionClosed, OP_TEXT, OP_CONT, OP_CLOSE, OP_PING, OP_PONG,
+    new_key, accept_key, encode_frame, close_payload, parse_close, read_frame, read_http_head,
+)
+
+
+class AsyncWebSocket:
+    """Minimal asyncio websocket client.
+
+    `send` and `close` can be called from any thread, so it can stand in for
+    `websocket.WebSocket` as `DiscordBot.ws`.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.reader = None
+        self.writer = None
+        self.connected = False
+        self.close_code = None
+        # Byte size of the message `recv` last returned, before any utf-8 decode
+        self.last_size = 0
+        # Sends handed over from other threads that the loop has not written yet
+        self.pending = 0
+
+    async def connect(self, url: str, timeout: float = 10):
+        parts = urlsplit(url)
+        secure = parts.scheme == "wss"
+        port = parts.port or (443 if secure else 80)
+        ctx = ssl.create_default_context() if secure else None
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(parts.hostname, port, ssl=ctx, server_hostname=parts.hostname if secure else None),
+            timeout
+        )
+        key = new_key()
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self.writer.write((
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {parts.netloc}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n\r\n"
+        ).encode("latin-1"))
+        status, headers = await asyncio.wait_for(read_http_head(self.reader), timeout)
+        if " 101 " not in f"{status} " or headers.get("sec-websocket-accept") != accept_key(key):
+            self.writer.close()
+            raise ConnectionError(f"WebSocket handshake failed: {status}")
+        self.connected = True
+
+    async def recv(self) -> str | bytes:
+        """Return the next text (str) or binary (bytes) message"""
+        chunks = []
+        first_opcode = None
+        while True:
+            try:
+                fin, opcode, payload = await read_frame(self.reader)
+            except (asyncio.IncompleteReadError, ConnectionError) as e:
+                self.connected = False
+                raise ConnectionClosed(None, str(e))
+            if opcode == OP_PING:
+                self._write(OP_PONG, payload)
+                continue
+            if opcode == OP_PONG:
+                continue
+            if opcode == OP_CLOSE:
+                self.close_code, reason = parse_close(payload)
+                if self.connected:
+                    self._write(OP_CLOSE, payload[:2])
+                self.connected = False
+                raise ConnectionClosed(self.close_code, reason)
+            if opcode != OP_CONT:
+                first_opcode = opcode
+            chunks.append(payload)
+            if fin:
+                data = b"".join(chunks)
+                self.last_size = len(data)
+                return data.decode("utf-8") if first_opcode == OP_TEXT else data
+
+    def _write(self, opcode: int, payload: bytes):
+        if self.writer is not None and not self.writer.is_closing():
+            self.writer.write(encode_frame(opcode, payload))
+
+    def send(self, data: str | bytes, opcode: int = OP_TEXT):
+        if not self.connected:
+            raise ConnectionClosed(self.close_code, "not connected")
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if _on_loop(self.loop):
+            self._write(opcode, data)
+        else:
+            self.pending += 1
+            self.loop.call_soon_threadsafe(self._write_pending, opcode, data)
+
+    def _write_pending(self, opcode: int, data: bytes):
+        self.pending -= 1
+        self._write(opcode, data)
+
+    def close(self, code: int = CLOSE_NORMAL):
+        if _on_loop(self.loop):
+            self._close(code)
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._close, code)
+
+    def abort(self):
+        """Drop the connection without a close handshake"""
+        if _on_loop(self.loop):
+            self._abort()
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._abort)
+
+    def _abort(self):
+        self.connected = False
+        if self.writer is not None:
+            self.writer.transport.abort()
+
+    def _close(self, code: int):
+        if self.connected:
+            self._write(OP_CLOSE, close_payload(code))
+        self.connected = False
+        if self.writer is not None:
+            self.writer.close()
+
+
+def _on_loop(loop: asyncio.AbstractEventLoop) -> bool:
+    try:
+        return asyncio.get_running_loop() is loop
+    except RuntimeError:
+        return False
+
+
+class AsyncGatewayEngine:
+    """Runs the whole gateway session as coroutines on one event loop.
+
+    Protocol handling stays in `DiscordBot`; this only replaces the
+    blocking recv thread, the per-connection heartbeat thread and the
+    reconnect sleeps.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.loop = None
+        self.thread = None
+        self._main_task = None
+
+    def start(self, status: str):
+        self.thread = threading.Thread(target=self._run, args=(status,), daemon=True)
+        self.thread.start()
+
+    def is_alive(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def stop(self):
+        loop, task = self.loop, self._main_task
+        if loop is not None and task is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(task.cancel)
+
+    def _run(self, status: str):
+        self.loop = asyncio.new_event_loop()
+        try:
+            self._main_task = self.loop.create_task(self._main(status))
+            self.loop.run_until_complete(self._main_task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.loop.close()
+
+    async def _recv_payload(self, ws: AsyncWebSocket):
+        while True:
+            frame = await ws.recv()
+            if self.bot.stages.enabled:
+                t0 = time.perf_counter()
+                payload = self.bot._feed_frame(frame, ws.last_size)
+                self.bot.stages.observe("recv", time.perf_counter() - t0)
+            else:
+                payload = self.bot._feed_frame(frame, ws.last_size)
+            if payload:
+                if self.bot.recorder is not None:
+                    self.bot.recorder.inbound(payload)
+                return payload
+
+    async def _heartbeat(self, interval: float):
+        bot = self.bot
+        await asyncio.sleep(bot.heartbeat.first_delay(interval))
+        while bot.monitoring_active and bot.ws and bot.ws.connected:
+            if not bot._beat():
+                break
+            await asyncio.sleep(interval / 1000.0)
+
+    async def _main(self, status: str):
+        bot = self.bot
+        while bot.monitoring_active:
+            resuming = bot.can_resume()
+            reason, close_code = "error", None
+            ws = AsyncWebSocket(self.loop)
+            heartbeat = None
+            bot.ws = ws
+            bot.inflator = ZlibStreamInflator() if bot.config.get("gateway_compress") else None
+            try:
+                url = bot.gateway_url(bot.resume_gateway_url if resuming else None)
+                await ws.connect(url)
+                if bot.recorder is not None:
+                    bot.recorder.opened(url)
+                hello_msg = bot._decode(await self._recv_payload(ws))
+                if hello_msg["op"] != 10:  # Not a HELLO
+                    raise RuntimeError(f"Expected HELLO, got op {hello_msg['op']}")
+
+                bot.heartbeat.reset()
+                bot.sender.connection_opened()
+                heartbeat = asyncio.create_task(self._heartbeat(hello_msg["d"]["heartbeat_interval"]))
+                if resuming:
+                    bot._send(bot._resume_payload())
+                else:
+                    bot._send(bot._identify_payload(status))
+
+                reason = "closed"
+                while bot.monitoring_active:
+                    msg = await self._recv_payload(ws)
+                    action = bot._process_message(msg, bot.message_size)
+                    if action:
+                        reason = action
+                        break
+            except ConnectionClosed as e:
+                close_code = e.code
+                if bot.recorder is not None:
+                    bot.recorder.closed(close_code)
+            except (OSError, asyncio.TimeoutError):
+                pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Gateway error: {e}")
+            finally:
+                if heartbeat is not None:
+                    heartbeat.cancel()
+                bot.session_connected = False
+                # Only stop() ends the session; anything else is resumed next
+                ws.close(CLOSE_RESUMABLE if bot.monitoring_active else CLOSE_NORMAL)
+
+            if not bot.monitoring_active:
+                break
+
+            bot.reconnect_count += 1
+            delay = bot._reconnect_delay(reason, close_code)
+            if delay is None:
+                break
+            if delay:
+                # stop() cancels the main task, which ends this sleep too
+                await asyncio.sleep(delay)
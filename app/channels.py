@@ -0,0 +1,72 @@
+import threading
+from .session import deep_sizeof
+
+
+class ChannelIndex:
+    """In-memory channel id -> guild id map, fed from gateway dispatches and REST answers"""
+
+    def __init__(self):
+        self._guild_of = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._guild_of)
+
+    def get(self, channel_id) -> str | None:
+        guild_id = self._guild_of.get(str(channel_id))
+        if guild_id is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return guild_id
+
+    def add(self, channel_id, guild_id):
+        if channel_id is None or guild_id is None:
+            return
+        with self._lock:
+            # Snowflakes are ints under ETF, keep one key type
+            self._guild_of[str(channel_id)] = str(guild_id)
+
+    def remove(self, channel_id):
+        with self._lock:
+            self._guild_of.pop(str(channel_id), None)
+
+    def add_guild(self, guild: dict):
+        guild_id = guild.get("id")
+        if guild_id is None:
+            return
+        guild_id = str(guild_id)
+        with self._lock:
+            for ch in guild.get("channels") or ():
+                if ch.get("id") is not None:
+                    self._guild_of[str(ch["id"])] = guild_id
+
+    def remove_guild(self, guild_id):
+        guild_id = str(guild_id)
+        with self._lock:
+            for cid in [c for c, g in self._guild_of.items() if g == guild_id]:
+                del self._guild_of[cid]
+
+    def handle_dispatch(self, t: str, d: dict):
+        if t == "READY":
+            for guild in d.get("guilds") or ():
+                self.add_guild(guild)
+        elif t == "GUILD_CREATE":
+            self.add_guild(d)
+        elif t == "GUILD_DELETE":
+            # `unavailable` means an outage, the channels still exist
+            if not d.get("unavailable"):
+                self.remove_guild(d.get("id"))
+        elif t in ("CHANNEL_CREATE", "CHANNEL_UPDATE"):
+            self.add(d.get("id"), d.get("guild_id"))
+        elif t == "CHANNEL_DELETE":
+            self.remove(d.get("id"))
+
+    def footprint(self) -> int:
+        with self._lock:
+            return deep_sizeof(self._guild_of)
+
+    def stats(self) -> dict:
+        return {"channels": len(self._guild_of), "hits": self.hits, "misses": self.misses}
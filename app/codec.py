@@ -0,0 +1,330 @@
+import re
+import json
+import struct
+
+# Websocket frame opcodes, so callers can send without importing websocket
+OPCODE_TEXT = 0x1
+OPCODE_BINARY = 0x2
+
+
+# Top-level "t", "s" and "op" members; Discord sends them ahead of "d"
+_HEAD_STR = re.compile(r'"(t|s|op)"\s*:\s*(null|"([A-Z0-9_]*)"|-?\d+)')
+_HEAD_BYTES = re.compile(_HEAD_STR.pattern.encode("ascii"))
+
+
+class JsonCodec:
+    """Stdlib `json`, text frames"""
+    name = "json"
+    encoding = "json"
+    opcode = OPCODE_TEXT
+
+    def encode(self, payload: dict) -> str:
+        return json.dumps(payload, separators=(",", ":"))
+
+    def decode(self, data: str | bytes) -> dict:
+        return json.loads(data)
+
+    def peek(self, data: str | bytes) -> tuple | None:
+        """Return (op, s, t) without parsing "d", or None if the frame must be fully decoded"""
+        if isinstance(data, str):
+            pattern, d_key, null = _HEAD_STR, '"d":', "null"
+        else:
+            pattern, d_key, null = _HEAD_BYTES, b'"d":', b"null"
+        end = data.find(d_key)
+        if end < 0:
+            return None
+        head = {}
+        for m in pattern.finditer(data, 0, end):
+            key, value, text = m.group(1, 2, 3)
+            if not isinstance(key, str):
+                key = key.decode("ascii")
+            if text is not None:
+                head[key] = text if isinstance(text, str) else text.decode("ascii")
+            elif value == null:
+                head[key] = None
+            else:
+                head[key] = int(value)
+        if len(head) != 3:
+            return None
+        return head["op"], head["s"], head["t"]
+
+
+class OrjsonCodec(JsonCodec):
+    """orjson fast path, same wire format as JsonCodec"""
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self._dumps = orjson.dumps
+        self._loads = orjson.loads
+
+    def encode(self, payload: dict) -> bytes:
+        # Text frames accept the already UTF-8 encoded bytes as-is
+        return self._dumps(payload)
+
+    def decode(self, data: str | bytes) -> dict:
+        return self._loads(data)
+
+
+# External Term Format tags, see https://www.erlang.org/doc/apps/erts/erl_ext_dist
+ETF_VERSION = 131
+NEW_FLOAT_EXT = 70
+SMALL_INTEGER_EXT = 97
+INTEGER_EXT = 98
+FLOAT_EXT = 99
+ATOM_EXT = 100
+SMALL_TUPLE_EXT = 104
+LARGE_TUPLE_EXT = 105
+NIL_EXT = 106
+STRING_EXT = 107
+LIST_EXT = 108
+BINARY_EXT = 109
+SMALL_BIG_EXT = 110
+LARGE_BIG_EXT = 111
+MAP_EXT = 116
+SMALL_ATOM_EXT = 115
+ATOM_UTF8_EXT = 118
+SMALL_ATOM_UTF8_EXT = 119
+
+_ATOMS = {"nil": None, "null": None, "true": True, "false": False}
+_u8 = struct.Struct(">B")
+_u16 = struct.Struct(">H")
+_u32 = struct.Struct(">I")
+_i32 = struct.Struct(">i")
+_f64 = struct.Struct(">d")
+
+
+class EtfCodec:
+    """Pure-Python Erlang External Term Format, binary frames.
+
+    Mirrors what Discord's erlpack does: strings go out as binaries, atoms
+    come back as str (or None/True/False), snowflakes arrive as integers.
+    """
+    name = "etf"
+    encoding = "etf"
+    opcode = OPCODE_BINARY
+
+    def encode(self, payload) -> bytes:
+        out = bytearray((ETF_VERSION,))
+        self._encode(payload, out)
+        return bytes(out)
+
+    def decode(self, data: bytes) -> dict:
+        if isinstance(data, str):
+            data = data.encode("latin-1")
+        if not data or data[0] != ETF_VERSION:
+            raise ValueError("Not an ETF payload")
+        value, _ = self._decode(data, 1)
+        return value
+
+    def peek(self, data: bytes) -> tuple | None:
+        """Return (op, s, t) by skipping over "d" instead of building it"""
+        if isinstance(data, str) or not data or data[0] != ETF_VERSION or data[1] != MAP_EXT:
+            return None
+        arity = _u32.unpack_from(data, 2)[0]
+        pos = 6
+        head = {}
+        for _ in range(arity):
+            key, pos = self._decode(data, pos)
+            if key == "d":
+                pos = self._skip(data, pos)
+            else:
+                head[key], pos = self._decode(data, pos)
+        if not {"op", "s", "t"} <= head.keys():
+            return None
+        return head["op"], head["s"], head["t"]
+
+    def _skip(self, data: bytes, pos: int) -> int:
+        """Position just past the term at `pos`, without materialising it"""
+        tag = data[pos]
+        pos += 1
+        if tag == SMALL_INTEGER_EXT:
+            return pos + 1
+        if tag == INTEGER_EXT:
+            return pos + 4
+        if tag == NEW_FLOAT_EXT:
+            return pos + 8
+        if tag == FLOAT_EXT:
+            return pos + 31
+        if tag == BINARY_EXT:
+            return pos + 4 + _u32.unpack_from(data, pos)[0]
+        if tag in (SMALL_ATOM_UTF8_EXT, SMALL_ATOM_EXT):
+            return pos + 1 + data[pos]
+        if tag in (ATOM_UTF8_EXT, ATOM_EXT, STRING_EXT):
+            return pos + 2 + _u16.unpack_from(data, pos)[0]
+        if tag == SMALL_BIG_EXT:
+            return pos + 2 + data[pos]
+        if tag == LARGE_BIG_EXT:
+            return pos + 5 + _u32.unpack_from(data, pos)[0]
+        if tag == NIL_EXT:
+            return pos
+        if tag == MAP_EXT:
+            count = _u32.unpack_from(data, pos)[0] * 2
+            pos += 4
+        elif tag == LIST_EXT:
+            # Elements plus the tail
+            count = _u32.unpack_from(data, pos)[0] + 1
+            pos += 4
+        elif tag == SMALL_TUPLE_EXT:
+            count = data[pos]
+            pos += 1
+        elif tag == LARGE_TUPLE_EXT:
+            count = _u32.unpack_from(data, pos)[0]
+            pos += 4
+        else:
+            raise ValueError(f"Unsupported ETF tag {tag}")
+        for _ in range(count):
+            pos = self._skip(data, pos)
+        return pos
+
+    def _encode(self, value, out: bytearray):
+        if value is None:
+            self._encode_atom("nil", out)
+        elif value is True:
+            self._encode_atom("true", out)
+        elif value is False:
+            self._encode_atom("false", out)
+        elif isinstance(value, int):
+            if 0 <= value <= 255:
+                out += bytes((SMALL_INTEGER_EXT, value))
+            elif -2**31 <= value < 2**31:
+                out.append(INTEGER_EXT)
+                out += _i32.pack(value)
+            else:
+                sign = 1 if value < 0 else 0
+                digits = abs(value).to_bytes((abs(value).bit_length() + 7) // 8, "little")
+                if len(digits) > 255:
+                    raise ValueError("Integer too large for ETF")
+                out += bytes((SMALL_BIG_EXT, len(digits), sign))
+                out += digits
+        elif isinstance(value, float):
+            out.append(NEW_FLOAT_EXT)
+            out += _f64.pack(value)
+        elif isinstance(value, str):
+            raw = value.encode("utf-8")
+            out.append(BINARY_EXT)
+            out += _u32.pack(len(raw))
+            out += raw
+        elif isinstance(value, (bytes, bytearray)):
+            out.append(BINARY_EXT)
+            out += _u32.pack(len(value))
+            out += value
+        elif isinstance(value, dict):
+            out.append(MAP_EXT)
+            out += _u32.pack(len(value))
+            for k, v in value.items():
+                self._encode(k, out)
+                self._encode(v, out)
+        elif isinstance(value, (list, tuple)):
+            if not value:
+                out.append(NIL_EXT)
+                return
+            out.append(LIST_EXT)
+            out += _u32.pack(len(value))
+            for item in value:
+                self._encode(item, out)
+            out.append(NIL_EXT)
+        else:
+            raise TypeError(f"Cannot ETF-encode {type(value).__name__}")
+
+    @staticmethod
+    def _encode_atom(name: str, out: bytearray):
+        raw = name.encode("utf-8")
+        out += bytes((SMALL_ATOM_UTF8_EXT, len(raw)))
+        out += raw
+
+    def _decode(self, data: bytes, pos: int):
+        tag = data[pos]
+        pos += 1
+        if tag == SMALL_INTEGER_EXT:
+            return data[pos], pos + 1
+        if tag == INTEGER_EXT:
+            return _i32.unpack_from(data, pos)[0], pos + 4
+        if tag == BINARY_EXT:
+            size = _u32.unpack_from(data, pos)[0]
+            pos += 4
+            return data[pos:pos + size].decode("utf-8"), pos + size
+        if tag == MAP_EXT:
+            arity = _u32.unpack_from(data, pos)[0]
+            pos += 4
+            result = {}
+            for _ in range(arity):
+                key, pos = self._decode(data, pos)
+                result[key], pos = self._decode(data, pos)
+            return result, pos
+        if tag in (SMALL_ATOM_UTF8_EXT, SMALL_ATOM_EXT):
+            size = data[pos]
+            pos += 1
+            return self._atom(data[pos:pos + size]), pos + size
+        if tag in (ATOM_UTF8_EXT, ATOM_EXT):
+            size = _u16.unpack_from(data, pos)[0]
+            pos += 2
+            return self._atom(data[pos:pos + size]), pos + size
+        if tag == LIST_EXT:
+            length = _u32.unpack_from(data, pos)[0]
+            pos += 4
+            items = []
+            for _ in range(length):
+                item, pos = self._decode(data, pos)
+                items.append(item)
+            # Proper lists end with NIL_EXT, anything else is an improper tail
+            tail, pos = self._decode(data, pos)
+            if tail != []:
+                items.append(tail)
+            return items, pos
+        if tag == NIL_EXT:
+            return [], pos
+        if tag == SMALL_BIG_EXT:
+            size = data[pos]
+            return self._big(data, pos + 1, size)
+        if tag == LARGE_BIG_EXT:
+            size = _u32.unpack_from(data, pos)[0]
+            return self._big(data, pos + 4, size)
+        if tag == NEW_FLOAT_EXT:
+            return _f64.unpack_from(data, pos)[0], pos + 8
+        if tag == FLOAT_EXT:
+            return float(data[pos:pos + 31].split(b"\x00", 1)[0]), pos + 31
+        if tag == STRING_EXT:
+            size = _u16.unpack_from(data, pos)[0]
+            pos += 2
+            return data[pos:pos + size].decode("latin-1"), pos + size
+        if tag in (SMALL_TUPLE_EXT, LARGE_TUPLE_EXT):
+            if tag == SMALL_TUPLE_EXT:
+                arity = data[pos]
+                pos += 1
+            else:
+                arity = _u32.unpack_from(data, pos)[0]
+                pos += 4
+            items = []
+            for _ in range(arity):
+                item, pos = self._decode(data, pos)
+                items.append(item)
+            return tuple(items), pos
+        raise ValueError(f"Unsupported ETF tag {tag}")
+
+    @staticmethod
+    def _atom(raw: bytes):
+        name = raw.decode("utf-8")
+        return _ATOMS.get(name, name)
+
+    @staticmethod
+    def _big(data: bytes, pos: int, size: int):
+        sign = data[pos]
+        value = int.from_bytes(data[pos + 1:pos + 1 + size], "little")
+        return (-value if sign else value), pos + 1 + size
+
+
+CODECS = {
+    "json": JsonCodec,
+    "orjson": OrjsonCodec,
+    "etf": EtfCodec,
+}
+
+
+def get_codec(name: str):
+    """Build the codec configured by `gateway_encoding`, falling back to stdlib json"""
+    factory = CODECS.get((name or "json").lower(), JsonCodec)
+    try:
+        return factory()
+    except ImportError:
+        return JsonCodec()
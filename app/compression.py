@@ -0,0 +1,37 @@
+import zlib
+
+ZLIB_SUFFIX = b"\x00\x00\xff\xff"
+
+
+class ZlibStreamInflator:
+    """Inflates a `compress=zlib-stream` gateway connection.
+
+    One instance must live for exactly one websocket connection: the server
+    keeps a single deflate context for the whole connection, so the client
+    has to keep the matching inflate context too.
+    """
+
+    def __init__(self, size: int = 65536):
+        self._inflator = zlib.decompressobj()
+        # Reused for every message that spans several frames; only grows
+        self._buffer = bytearray(size)
+        self._fill = 0
+
+    def feed(self, data: bytes) -> bytes | None:
+        """Buffer a binary frame, return the payload once a full message arrived"""
+        if not self._fill and data[-4:] == ZLIB_SUFFIX:
+            # The usual case: the whole message in one frame, nothing to buffer
+            return self._inflator.decompress(data)
+        end = self._fill + len(data)
+        if end > len(self._buffer):
+            self._buffer.extend(bytes(max(end, 2 * len(self._buffer)) - len(self._buffer)))
+        self._buffer[self._fill:end] = data
+        self._fill = end
+        # A message may be split across several frames, and the Z_SYNC_FLUSH
+        # marker itself may straddle two of them, so check the whole buffer.
+        with memoryview(self._buffer) as view:
+            if end < 4 or view[end - 4:end] != ZLIB_SUFFIX:
+                return None
+            out = self._inflator.decompress(view[:end])
+        self._fill = 0
+        return out
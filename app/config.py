@@ -1,12 +1,48 @@
+import os
+import copy
 import json
+import atexit
+import tempfile
+import threading
 from pathlib import Path
+from collections.abc import MutableMapping
 
 DEFAULTS = {
     "status": "online",
     "custom_status": "github:ZeleMarsh7mary/@zeleresia",
     "heartbeat_interval": 50,
     "auto_join_voice": False,
-    "voice_channel_id": ""
+    "voice_channel_id": "",
+    "voice_guild_id": "",
+    "gateway_compress": False,
+    "gateway_encoding": "json",
+    "gateway_engine": "thread",
+    "lazy_dispatch": True,
+    "identify_properties": {
+        "$os": "Windows 10",
+        "$browser": "Chrome",
+        "$device": "Windows"
+    },
+    "identify_intents": None,
+    "identify_capabilities": None,
+    "identify_large_threshold": 50,
+    "identify_compress": False,
+    "api_url": "",
+    "gateway_url": "",
+    "metrics_interval": 1.0,
+    "metrics_window": 300,
+    "metrics_exporter": "",
+    "identity_cache_ttl": 3600,
+    "record_path": "",
+    "record_max_mb": 64,
+    "record_max_files": 4,
+    "instrument_stages": False,
+    "profile_dir": "",
+    "supervisor_stall_timeout": 120,
+    "supervisor_report_timeout": 30,
+    "supervisor_max_rss_mb": 0,
+    "supervisor_max_cpu_percent": 0,
+    "supervisor_cpu_seconds": 60
 }
 
 def load_config(path: Path) -> dict:
@@ -14,17 +50,182 @@ def load_config(path: Path) -> dict:
         with path.open("r", encoding="utf-8") as f:
             data = json.load(f)
     except FileNotFoundError:
-        data = DEFAULTS.copy()
+        data = copy.deepcopy(DEFAULTS)
         save_config(path, data)
     changed = False
     for k, v in DEFAULTS.items():
         if k not in data:
-            data[k] = v
+            data[k] = copy.deepcopy(v)
             changed = True
     if changed:
         save_config(path, data)
     return data
 
 def save_config(path: Path, data: dict) -> None:
-    with path.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
+    """Write to a temp file in the same directory, fsync, then rename over the target"""
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    if hasattr(os, "O_DIRECTORY"):
+        # Make the rename itself durable
+        dirfd = os.open(path.parent, os.O_DIRECTORY)
+        try:
+            os.fsync(dirfd)
+        finally:
+            os.close(dirfd)
+
+
+class ConfigStore(MutableMapping):
+    """The one in-memory copy of a config file, shared by everything in the process.
+
+    Assignments are written behind: writes within `debounce` seconds are
+    coalesced into a single atomic save on a background timer. `watch()`
+    polls the file's mtime and applies external edits, notifying
+    `subscribe()`d callbacks with a dict of the changed keys. Keys assigned
+    since the last save win over the file until that save happens.
+    """
+
+    _stores = {}
+    _stores_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path: Path) -> "ConfigStore":
+        key = Path(path).resolve()
+        with cls._stores_lock:
+            store = cls._stores.get(key)
+            if store is None:
+                store = cls._stores[key] = cls(key)
+            return store
+
+    def __init__(self, path: Path, debounce: float = 0.5, poll_interval: float = 1.0):
+        self.path = Path(path)
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._data = load_config(self.path)
+        self._stamp = self._file_stamp()
+        self._timer = None
+        # Keys changed in memory and not saved yet
+        self._pending = set()
+        self._listeners = []
+        self._watcher = None
+        self._stop = threading.Event()
+        self.writes = 0
+        self.reloads = 0
+        atexit.register(self.flush)
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._pending.add(key)
+            self._schedule_save()
+
+    def __delitem__(self, key):
+        with self._lock:
+            del self._data[key]
+            self._pending.add(key)
+            self._schedule_save()
+
+    def __iter__(self):
+        return iter(list(self._data))
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._data)
+
+    def _file_stamp(self):
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _schedule_save(self):
+        if self._timer is None:
+            self._timer = threading.Timer(self.debounce, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Write pending changes now"""
+        with self._lock:
+            if self._timer is None:
+                return
+        try:
+            # Pick up an external edit the watcher has not seen yet instead of writing over it
+            self.reload()
+        except (OSError, ValueError):
+            pass
+        with self._lock:
+            if self._timer is None:
+                return
+            self._timer.cancel()
+            self._timer = None
+            self._pending.clear()
+            data = dict(self._data)
+        with self._write_lock:
+            save_config(self.path, data)
+            self._stamp = self._file_stamp()
+            self.writes += 1
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def watch(self):
+        """Start polling the file for external edits (idempotent)"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch_loop, daemon=True)
+        self._watcher.start()
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+    def _watch_loop(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.reload()
+            except (OSError, ValueError):
+                # Half-written or invalid file from an external editor, try again next poll
+                continue
+
+    def reload(self) -> dict:
+        """Re-read the file if it changed on disk, returns the changed keys"""
+        with self._write_lock:
+            stamp = self._file_stamp()
+            if stamp is None or stamp == self._stamp:
+                return {}
+            with self.path.open("r", encoding="utf-8") as f:
+                fresh = json.load(f)
+            self._stamp = stamp
+        with self._lock:
+            # The pending save rewrites the file with both sets of changes
+            changed = {k: v for k, v in fresh.items() if k not in self._pending and self._data.get(k) != v}
+            self._data.update(changed)
+        if changed:
+            self.reloads += 1
+            for callback in list(self._listeners):
+                try:
+                    callback(changed)
+                except Exception as e:
+                    print(f"Config listener error: {e}")
+        return changed
@@ -0,0 +1,360 @@
+"""Line-delimited JSON control protocol over a Unix domain socket.
+
+Each request is one object with a "cmd" member, e.g. {"cmd": "status"};
+each response is one object with "ok" and either the result members or
+"error". Commands: status, stats, watch, presence, voice, profile, instrument,
+set, stop.
+"""
+import os
+import json
+import time
+import socket
+import threading
+from pathlib import Path
+from .config import DEFAULTS
+from .metrics import RingBuffer
+from .state import StateStore
+
+
+def default_socket_path(config_path: Path) -> Path:
+    return Path(config_path).with_name("bot.sock")
+
+
+class ControlServer:
+    """Serves the control protocol for one `DiscordBot` on a daemon thread"""
+
+    def __init__(self, bot, path: Path, on_stop=None):
+        self.bot = bot
+        self.path = Path(path)
+        self.on_stop = on_stop
+        self.sock = None
+        self.clients = 0
+        self._thread = None
+
+    def start(self):
+        if self.path.exists():
+            # Refuse to steal the socket of a daemon that is still running
+            try:
+                ControlClient(self.path, timeout=1).close()
+            except OSError:
+                self.path.unlink()
+            else:
+                raise RuntimeError(f"A daemon is already listening on {self.path}")
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            self.sock.bind(str(self.path))
+        finally:
+            os.umask(old_umask)
+        self.sock.listen(4)
+        self._thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            finally:
+                self.sock = None
+                try:
+                    self.path.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def _accept_loop(self):
+        while self.sock is not None:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: socket.socket):
+        self.clients += 1
+        try:
+            with conn, conn.makefile("rwb") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    response = self.handle(line)
+                    f.write(json.dumps(response).encode("utf-8") + b"\n")
+                    f.flush()
+        except OSError:
+            pass
+        finally:
+            self.clients -= 1
+
+    def handle(self, line: bytes) -> dict:
+        try:
+            request = json.loads(line)
+            handler = getattr(self, "cmd_" + str(request.pop("cmd")), None)
+            if handler is None:
+                return {"ok": False, "error": "unknown command"}
+            return {"ok": True, **handler(**request)}
+        except Exception as e:
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    def cmd_status(self, points: int = 0) -> dict:
+        bot = self.bot
+        result = {
+            "username": bot.username,
+            "userid": bot.userid,
+            "session_connected": bot.session_connected,
+            "voice_connected": bot.voice_connected,
+            "voice_guild_id": bot.voice_guild_id,
+            "start_time": bot.start_time,
+            "system": bot.get_system_stats(),
+            "latency": bot.get_latency_stats(),
+            "state_bytes": bot.get_state_footprint(),
+            "reconnects": bot.reconnect_count,
+            "resumes": bot.resume_count,
+            "gateway_fatal": bot.reconnect.fatal,
+            "config": bot.config.snapshot(),
+        }
+        if points:
+            # Enough history for sparklines, summaries cover the whole window
+            result["series"] = {
+                name: {"points": buf.values()[-points:], "summary": buf.summary()}
+                for name, buf in bot.metrics.series.items()
+            }
+        return result
+
+    def cmd_stats(self) -> dict:
+        bot = self.bot
+        return {
+            "metrics": bot.metrics.summary(),
+            "latency": bot.get_latency_stats(),
+            "inbound": bot.get_inbound_stats(),
+            "transport": bot.get_transport_stats(),
+            "codec": bot.get_codec_stats(),
+            "rest": bot.get_rest_stats(),
+            "send": bot.get_send_stats(),
+            "reconnect": bot.get_reconnect_stats(),
+            "voice": bot.get_voice_stats(),
+            "startup": bot.get_startup_stats(),
+            "stages": bot.get_stage_stats(),
+            "channels": bot.channels.stats(),
+        }
+
+    def cmd_watch(self, version: int = 0, timeout: float = 5.0) -> dict:
+        """Long poll: returns the state keys changed after `version` once there are any"""
+        self.bot.state.wait(version, min(float(timeout), 30.0))
+        version, changes = self.bot.state.changes_since(version)
+        return {"version": version, "changes": changes}
+
+    def cmd_presence(self, status: str | None = None, custom_status: str | None = None) -> dict:
+        if status is not None:
+            if status not in ("online", "idle", "dnd", "invisible"):
+                raise ValueError(f"invalid status {status!r}")
+            self.bot.config["status"] = status
+        if custom_status is not None:
+            self.bot.config["custom_status"] = custom_status
+        self.bot.update_presence()
+        return {"status": self.bot.config.get("status"), "custom_status": self.bot.config.get("custom_status")}
+
+    def cmd_voice(self, action: str = "toggle", channel_id: str | None = None) -> dict:
+        bot = self.bot
+        if action == "toggle":
+            return {"result": bot.toggle_voice(channel_id or bot.config.get("voice_channel_id"))}
+        if action == "join":
+            cid = channel_id or bot.config.get("voice_channel_id")
+            return {"result": "connected" if cid and bot.join_voice_channel(cid) else "failed"}
+        if action == "leave":
+            return {"result": "disconnected" if bot.leave_voice_channel() else "failed"}
+        raise ValueError(f"invalid voice action {action!r}")
+
+    def cmd_profile(self, kind: str = "cpu", seconds: float = 10.0) -> dict:
+        """Start a capture; the report is written when it finishes"""
+        return {"kind": kind, "seconds": seconds, "path": self.bot.start_profile(kind, seconds)}
+
+    def cmd_instrument(self, enabled: bool = True) -> dict:
+        self.bot.set_instrumentation(bool(enabled))
+        return {"enabled": self.bot.stages.enabled}
+
+    def cmd_set(self, key: str, value) -> dict:
+        if key not in DEFAULTS:
+            raise KeyError(key)
+        self.bot.config[key] = value
+        # Apply it the same way as an edit to the config file
+        self.bot._on_config_changed({key: value})
+        return {key: value}
+
+    def cmd_stop(self) -> dict:
+        # Reply first, then shut down from another thread
+        threading.Timer(0.1, self.on_stop or self.bot.stop).start()
+        return {"stopping": True}
+
+
+class ControlClient:
+    """Blocking client for `ControlServer`, one request in flight at a time"""
+
+    def __init__(self, path: Path, timeout: float = 10):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(str(path))
+        except OSError:
+            self.sock.close()
+            raise
+        self._file = self.sock.makefile("rwb")
+        self._lock = threading.Lock()
+
+    def request(self, cmd: str, **args) -> dict:
+        with self._lock:
+            self._file.write(json.dumps({"cmd": cmd, **args}).encode("utf-8") + b"\n")
+            self._file.flush()
+            line = self._file.readline()
+        if not line:
+            raise ConnectionError("Daemon closed the control connection")
+        response = json.loads(line)
+        if not response.pop("ok", False):
+            raise RuntimeError(response.get("error", "request failed"))
+        return response
+
+    def close(self):
+        try:
+            self._file.close()
+        finally:
+            self.sock.close()
+
+
+class RemoteSeries(RingBuffer):
+    """Sparkline points copied from the daemon plus its whole-window summary"""
+
+    def __init__(self, points: list, summary: dict):
+        super().__init__(max(1, len(points)))
+        for value in points:
+            self.append(value)
+        self._summary = summary
+
+    def summary(self) -> dict:
+        return self._summary
+
+
+class RemoteConfig(dict):
+    """Daemon config as of the last refresh; assignments are sent with `set`"""
+
+    def __init__(self, remote):
+        super().__init__()
+        self._remote = remote
+
+    def __setitem__(self, key, value):
+        self._remote.client.request("set", key=key, value=value)
+        super().__setitem__(key, value)
+
+    def subscribe(self, callback):
+        pass
+
+
+class RemoteMetrics:
+    def __init__(self):
+        self.series = {}
+
+
+class RemoteBot:
+    """The parts of `DiscordBot` the panel uses, backed by a running daemon.
+
+    One `status` request per refresh feeds every attribute, so composing a
+    frame costs a single round trip. A second connection long-polls `watch`
+    and mirrors the daemon's state store into `self.state`.
+    """
+    POINTS = 120
+
+    def __init__(self, client: ControlClient, max_age: float = 0.5, path: Path | None = None):
+        self.client = client
+        self.max_age = max_age
+        self.config = RemoteConfig(self)
+        self.metrics = RemoteMetrics()
+        self.state = StateStore()
+        self.monitoring_active = True
+        self._status = {}
+        self._fetched = 0.0
+        self.refresh(force=True)
+        self._watcher = None
+        if path is not None:
+            self._watcher = ControlClient(path, timeout=15)
+            threading.Thread(target=self._watch, daemon=True).start()
+
+    def _watch(self):
+        version = 0
+        while self.monitoring_active:
+            try:
+                response = self._watcher.request("watch", version=version, timeout=10)
+            except (OSError, ConnectionError, ValueError, RuntimeError):
+                return
+            version = response["version"]
+            if response["changes"]:
+                # The next frame refetches status instead of waiting out max_age
+                self._fetched = 0.0
+                self.state.update(response["changes"])
+
+    def refresh(self, force: bool = False):
+        if not force and time.monotonic() - self._fetched < self.max_age:
+            return
+        try:
+            status = self.client.request("status", points=self.POINTS)
+        except (OSError, ConnectionError, ValueError):
+            self.monitoring_active = False
+            return
+        self._status = status
+        self._fetched = time.monotonic()
+        dict.clear(self.config)
+        dict.update(self.config, status["config"])
+        self.metrics.series = {
+            name: RemoteSeries(s["points"], s["summary"]) for name, s in status.get("series", {}).items()
+        }
+
+    def _get(self, key):
+        self.refresh()
+        return self._status.get(key)
+
+    @property
+    def username(self) -> str:
+        return self._get("username") or ""
+
+    @property
+    def session_connected(self) -> bool:
+        return bool(self._get("session_connected"))
+
+    @property
+    def voice_connected(self) -> bool:
+        return bool(self._get("voice_connected"))
+
+    @property
+    def start_time(self) -> float:
+        return self._get("start_time") or time.time()
+
+    def get_system_stats(self) -> dict:
+        return self._get("system")
+
+    def get_latency_stats(self) -> dict:
+        return self._get("latency")
+
+    def get_state_footprint(self) -> int:
+        return self._get("state_bytes") or 0
+
+    def _after(self, response: dict):
+        self.refresh(force=True)
+        return response
+
+    def update_presence(self):
+        self._after(self.client.request("presence"))
+
+    def toggle_voice(self, channel_id: str | None = None) -> str:
+        return self._after(self.client.request("voice", action="toggle", channel_id=channel_id))["result"]
+
+    def join_voice_channel(self, channel_id: str) -> bool:
+        return self._after(self.client.request("voice", action="join", channel_id=channel_id))["result"] == "connected"
+
+    def leave_voice_channel(self) -> bool:
+        return self._after(self.client.request("voice", action="leave"))["result"] == "disconnected"
+
+    def start_profile(self, kind: str = "cpu", seconds: float = 10.0) -> str:
+        return self.client.request("profile", kind=kind, seconds=seconds)["path"]
+
+    def stop(self):
+        """Detach; the daemon keeps running"""
+        self.monitoring_active = False
+        self.client.close()
+        if self._watcher is not None:
+            self._watcher.close()
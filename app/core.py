@@ -1,68 +1,336 @@
-import json
+import os
 import time
-import requests
-import websocket
-import psutil
+import zlib
 import threading
+from collections import Counter
+from functools import partial
 from pathlib import Path
-from .config import load_config, save_config
+from .config import DEFAULTS, ConfigStore
+from .compression import ZlibStreamInflator
+from .codec import get_codec
+from .heartbeat import HeartbeatTracker, LatencyHistogram
+from .channels import ChannelIndex
+from .session import UserRecord, VoiceStateRecord, digest_ready, deep_sizeof
+from .rest import get_client
+from .identity import IdentityCache
+from .metrics import MetricsSampler
+from .sender import SendScheduler
+from .reconnect import ReconnectPolicy, CLOSE_AUTHENTICATION_FAILED, CLOSE_NORMAL, CLOSE_RESUMABLE
+from .wsproto import ConnectionClosed, parse_close, OP_CLOSE, OP_TEXT
+from .state import StateStore, StateField
+from .profiling import StageTimers, start_capture
 
-API = "https://discord.com/api/v9"
-GATEWAY_URL = "wss://gateway.discord.gg/?v=9&encoding=json"
+GATEWAY_URL = "wss://gateway.discord.gg"
+GATEWAY_VERSION = 9
+IDENTITY_CACHE_NAME = ".identity_cache.json"
+# Minimum seconds between automatic voice rejoins
+VOICE_REJOIN_INTERVAL = 5.0
+
+class AuthenticationError(RuntimeError):
+    """The API rejected the token; retrying with the same one cannot help"""
 
 class DiscordBot:
+    # Written from the gateway thread, read and subscribed to through `self.state`
+    session_connected = StateField()
+    voice_connected = StateField()
+    voice_guild_id = StateField()
+    username = StateField()
+    discriminator = StateField()
+    userid = StateField()
+
     def __init__(self, token: str, config_path: Path):
+        self.state = StateStore(
+            session_connected=False,
+            voice_connected=False,
+            voice_guild_id=None,
+            voice_channel=None,
+            username="",
+            discriminator="",
+            userid="",
+            status=None,
+            custom_status=None,
+            latency_ms=None,
+            stats=None,
+            gateway_fatal=None,
+        )
         self.token = token
         self.headers = {"Authorization": token, "Content-Type": "application/json"}
         self.config_path = config_path
-        self.config = load_config(config_path)
+        # Shared with the CLI; edits are saved behind and external edits reloaded live
+        self.config = ConfigStore.open(config_path)
+        self.config.subscribe(self._on_config_changed)
+        # Endpoint overrides: config first, then environment, then discord.com
+        self.api_url = self.config.get("api_url") or None
+        self.gateway_base = self.config.get("gateway_url") or os.getenv("DISCORD_GATEWAY_URL") or GATEWAY_URL
+        self.rest = get_client(self.api_url)
+        self.identity = IdentityCache(
+            Path(config_path).with_name(IDENTITY_CACHE_NAME),
+            ttl=float(self.config.get("identity_cache_ttl", 3600)),
+        )
         self.userinfo = None
-        self.username = ""
-        self.discriminator = ""
-        self.userid = ""
+        self.user = None
+        self._voice_state = None
+        self._footprint = (None, 0)
         self.monitoring_active = True
-        self.session_connected = False
-        self.voice_connected = False
+        # Desired voice state is reconciled after READY/RESUMED and on VOICE_STATE_UPDATE
+        self.voice_rejoin_latency = LatencyHistogram()
+        self.voice_rejoins = 0
+        self.voice_moved = 0
+        self.voice_disconnected = 0
+        self._voice_rejoin_at = None
+        self._voice_last_attempt = 0.0
+        self._voice_timer = None
+        self.channels = ChannelIndex()
         self.start_time = time.time()
+        # Startup timings, see get_startup_stats()
+        self._created = time.perf_counter()
+        self.identity_source = None
+        self.identity_seconds = None
+        self.time_to_ready = None
         self._presence_thread = None
+        self._engine = None
         self.ws = None
         self.heartbeat_thread = None
         self.sequence = None
         self.session_id = None
+        self.resume_gateway_url = None
+        self.resume_count = 0
+        # Monotonic time of the last frame, the supervisor's stall watchdog reads it
+        self.last_recv_at = None
+        self.heartbeat = HeartbeatTracker()
+        self.reconnect_count = 0
+        self.codec = get_codec(self.config.get("gateway_encoding", "json"))
+        self.inflator = None
+        self.bytes_received_raw = 0
+        self.bytes_received = 0
+        # Byte size of the message `_feed_frame` last completed, measured before any utf-8 decode
+        self.message_size = 0
+        self.decoded_count = 0
+        self.decode_seconds = 0.0
+        self.skipped_events = Counter()
+        self.inbound_counts = Counter()
+        self.inbound_bytes = Counter()
+        self.inbound_total = 0
+        self.metrics = MetricsSampler(
+            self,
+            interval=float(self.config.get("metrics_interval", 1.0)),
+            window=int(self.config.get("metrics_window", 300)),
+        )
+        self.exporter = None
+        self.recorder = None
+        # Per-stage timings, off unless `instrument_stages` is set
+        self.stages = StageTimers(bool(self.config.get("instrument_stages")))
+        # Called on the gateway thread before each message, used by CPU profiling
+        self.gateway_hook = None
+        self.capture = None
+        # Every outbound payload goes through this one writer
+        self.sender = SendScheduler(self)
+        self.reconnect = ReconnectPolicy()
+        self.dispatch_handlers = {
+            "READY": self._on_ready,
+            "RESUMED": self._on_resumed,
+            "VOICE_STATE_UPDATE": self._on_voice_state_update,
+        }
+        for t in ("GUILD_CREATE", "GUILD_DELETE", "CHANNEL_CREATE", "CHANNEL_UPDATE", "CHANNEL_DELETE"):
+            self.register_dispatch(t, partial(self.channels.handle_dispatch, t))
 
     @staticmethod
-    def validate_token(token: str, timeout=10) -> bool:
+    def validate_token(token: str, timeout=10, cache: IdentityCache | None = None, base: str | None = None) -> bool:
+        """Check the token against `base`/users/@me; a fresh `cache` entry counts as valid and a success is cached"""
         if not token:
             return False
+        if cache is not None and cache.get(token) is not None:
+            return True
         try:
-            r = requests.get(f"{API}/users/@me", headers={"Authorization": token, "Content-Type": "application/json"}, timeout=timeout)
-            return r.status_code == 200
+            r = get_client(base or None).get("/users/@me", headers={"Authorization": token}, timeout=timeout)
+            if r.status_code != 200:
+                return False
+            if cache is not None:
+                cache.put(token, r.json())
+            return True
         except Exception:
             return False
 
     def connect(self, timeout=10) -> None:
-        r = requests.get(f"{API}/users/@me", headers=self.headers, timeout=timeout)
-        if r.status_code != 200:
-            raise RuntimeError("Failed to get user info")
-        self.userinfo = r.json()
-        self.username = self.userinfo.get("username", "")
-        self.discriminator = self.userinfo.get("discriminator", "")
-        self.userid = self.userinfo.get("id", "")
+        """Load our user from the identity cache, or from /users/@me when it is stale"""
+        t0 = time.perf_counter()
+        userinfo = self.identity.get(self.token)
+        source = "cache"
+        if userinfo is None:
+            r = self.rest.get("/users/@me", headers=self.headers, timeout=timeout)
+            if r.status_code != 200:
+                # Only a rejected token invalidates the cache; 429s and 5xx are transient
+                if r.status_code == 401:
+                    self.identity.discard(self.token)
+                    raise AuthenticationError("Token rejected (HTTP 401)")
+                raise RuntimeError(f"Failed to get user info (HTTP {r.status_code})")
+            userinfo = r.json()
+            source = "rest"
+            self.identity.put(self.token, userinfo)
+        self.userinfo = userinfo
+        self.identity_source = source
+        self.identity_seconds = time.perf_counter() - t0
+        # READY may have got here first, it carries the same user
+        if self.user is None:
+            self._set_user(UserRecord.from_payload(userinfo))
+
+    def login(self, timeout=10) -> None:
+        """Open the gateway and fetch our identity at the same time; raises (and stops) if the token is rejected"""
+        self.start_presence()
+        try:
+            self.connect(timeout)
+        except Exception:
+            self.stop()
+            raise
+
+    def get_startup_stats(self) -> dict:
+        def ms(v):
+            return None if v is None else round(v * 1000, 1)
+        return {
+            "identity": self.identity_source,
+            "identity_ms": ms(self.identity_seconds),
+            "time_to_ready_ms": ms(self.time_to_ready),
+        }
+
+    def _set_user(self, user: UserRecord):
+        self.user = user
+        self.state.update({"username": user.username, "discriminator": user.discriminator, "userid": user.id})
+
+    @property
+    def voice_state(self) -> VoiceStateRecord | None:
+        return self._voice_state
+
+    @voice_state.setter
+    def voice_state(self, record: VoiceStateRecord | None):
+        self._voice_state = record
+        self.state.set("voice_channel", record.channel_id if record else None)
 
     def get_system_stats(self) -> dict:
-        p = psutil.Process()
-        mem_mb = int(p.memory_info().rss / 1024 / 1024)
-        cpu = int(p.cpu_percent(interval=0.1))
-        
+        """Latest background sample; never blocks on psutil"""
+        sample = self.metrics.latest or self.metrics.sample()
         uptime = time.strftime("%H:%M:%S", time.gmtime(time.time() - self.start_time))
-        return {"memory_mb": mem_mb, "cpu_percent": cpu, "uptime": uptime}
+        return {
+            "memory_mb": int(sample["rss_mb"]),
+            "cpu_percent": int(sample["cpu_percent"]),
+            "threads": sample["threads"],
+            "uptime": uptime,
+        }
+
+    def gateway_url(self, base: str | None = None) -> str:
+        base = (base or self.gateway_base).rstrip("/")
+        url = f"{base}/?v={GATEWAY_VERSION}&encoding={self.codec.encoding}"
+        if self.config.get("gateway_compress"):
+            url += "&compress=zlib-stream"
+        return url
+
+    def get_transport_stats(self) -> dict:
+        raw, total = self.bytes_received_raw, self.bytes_received
+        saved = (1 - raw / total) * 100 if total else 0.0
+        return {"raw_bytes": raw, "decompressed_bytes": total, "saved_percent": round(saved, 1)}
+
+    def get_codec_stats(self) -> dict:
+        avg_us = self.decode_seconds / self.decoded_count * 1e6 if self.decoded_count else 0.0
+        return {
+            "codec": self.codec.name,
+            "decoded": self.decoded_count,
+            "skipped": sum(self.skipped_events.values()),
+            "avg_decode_us": round(avg_us, 2),
+        }
+
+    def _decode(self, msg) -> dict:
+        t0 = time.perf_counter()
+        data = self.codec.decode(msg)
+        self.decode_seconds += time.perf_counter() - t0
+        self.decoded_count += 1
+        return data
+
+    def _send(self, payload: dict) -> bool:
+        return self.sender.send(payload)
+
+    def _recv_payload(self):
+        """Receive one complete gateway message, or None if it is still incomplete"""
+        # recv() turns a close frame into "", recv_data() keeps its status code
+        opcode, data = self.ws.recv_data()
+        if opcode == OP_CLOSE:
+            code, reason = parse_close(data)
+            raise ConnectionClosed(code, reason)
+        size = len(data)
+        if opcode == OP_TEXT:
+            data = data.decode("utf-8")
+        if self.stages.enabled:
+            t0 = time.perf_counter()
+            payload = self._feed_frame(data, size)
+            self.stages.observe("recv", time.perf_counter() - t0)
+        else:
+            payload = self._feed_frame(data, size)
+        if payload is not None and self.recorder is not None:
+            self.recorder.inbound(payload)
+        return payload
+
+    def _feed_frame(self, msg, size: int):
+        """Account for one received frame of `size` bytes on the wire, returns the full message once complete"""
+        if not msg:
+            return None
+        self.last_recv_at = time.monotonic()
+        self.bytes_received_raw += size
+        if self.inflator is None:
+            # Per-payload compression: each binary frame is a complete zlib stream
+            if isinstance(msg, bytes) and msg[:1] == b"\x78" and self.config.get("identify_compress"):
+                msg = zlib.decompress(msg)
+                size = len(msg)
+            self.bytes_received += size
+            self.message_size = size
+            return msg
+        if isinstance(msg, str):
+            msg = msg.encode("utf-8")
+        payload = self.inflator.feed(msg)
+        if payload is not None:
+            self.bytes_received += len(payload)
+            self.message_size = len(payload)
+        return payload
+
+    def get_rest_stats(self) -> dict:
+        return self.rest.stats()
+
+    def get_state_footprint(self) -> int:
+        """Approximate bytes retained for session, user, voice and channel index state"""
+        key = (len(self.channels), self.session_id, self.voice_state)
+        if self._footprint[0] != key:
+            records = deep_sizeof((self.session_id, self.resume_gateway_url, self.user, self.voice_state))
+            self._footprint = (key, records + self.channels.footprint())
+        return self._footprint[1]
 
-    def send_heartbeat(self, interval):
-        """Separate thread for heartbeating"""
-        while self.monitoring_active and self.ws and self.ws.connected:
+    def get_latency_stats(self) -> dict:
+        return self.heartbeat.stats()
+
+    def _beat(self) -> bool:
+        """Send one heartbeat, returns False when the connection turned out to be a zombie"""
+        if not self.heartbeat.check():
+            # No ACK since the last beat: the socket is half-open, drop it now
+            # instead of waiting for the OS to notice
             try:
-                self.ws.send(json.dumps({"op": 1, "d": self.sequence}))
-                time.sleep(interval / 1000.0)  # Convert ms to seconds
+                self.ws.abort()
+            except Exception:
+                pass
+            return False
+        # The scheduler stamps the send time and current sequence when it writes
+        self._send({"op": 1})
+        return True
+
+    def send_heartbeat(self, interval, closed: threading.Event | None = None):
+        """Separate thread for heartbeating, ends as soon as `closed` is set"""
+        ws = self.ws
+        closed = closed or threading.Event()
+        delay = self.heartbeat.first_delay(interval)
+        while self.monitoring_active and self.ws is ws and ws.connected:
+            try:
+                if closed.wait(delay):
+                    break
+                if self.ws is not ws or not ws.connected:
+                    break
+                if not self._beat():
+                    break
+                delay = interval / 1000.0  # Convert ms to seconds
             except Exception:
                 break
 
@@ -80,24 +348,26 @@ class DiscordBot:
                 "self_deaf": deaf
             }
         }
-        try:
-            self.ws.send(json.dumps(payload))
-            return True
-        except Exception:
-            return False
+        return self._send(payload)
+
+    def resolve_guild(self, channel_id: str) -> str | None:
+        """Guild of a channel, from the gateway-fed index and only over REST on a miss"""
+        guild_id = self.channels.get(channel_id)
+        if guild_id is not None:
+            return guild_id
+        ch = self.rest.get(f"/channels/{channel_id}", route="GET /channels/{id}", headers=self.headers)
+        if ch.status_code != 200:
+            return None
+        guild_id = ch.json().get("guild_id")
+        self.channels.add(channel_id, guild_id)
+        return guild_id
 
     def join_voice_channel(self, channel_id: str) -> bool:
         if not channel_id:
             return False
             
         try:
-            # Get channel info to find guild_id
-            ch = requests.get(f"{API}/channels/{channel_id}", headers=self.headers)
-            if ch.status_code != 200:
-                return False
-                
-            channel_data = ch.json()
-            guild_id = channel_data.get("guild_id")
+            guild_id = self.resolve_guild(channel_id)
             if not guild_id:
                 return False
 
@@ -105,6 +375,10 @@ class DiscordBot:
             success = self.update_voice_state(guild_id, channel_id)
             if success:
                 self.voice_connected = True
+                self.voice_guild_id = guild_id
+                if channel_id == self.config.get("voice_channel_id") and self.config.get("voice_guild_id") != guild_id:
+                    # Remembered so later rejoins need no REST lookup
+                    self.config["voice_guild_id"] = guild_id
                 return True
             return False
             
@@ -116,100 +390,328 @@ class DiscordBot:
             return True
             
         try:
-            # Find the guild_id we're currently connected to
-            # This would typically be stored when joining, but for simplicity:
-            if self.config.get("voice_channel_id"):
-                ch = requests.get(f"{API}/channels/{self.config['voice_channel_id']}", headers=self.headers)
-                if ch.status_code == 200:
-                    guild_id = ch.json().get("guild_id")
-                    if guild_id:
-                        # Send None as channel_id to leave voice channel
-                        self.update_voice_state(guild_id, None)
+            # Guild of the current voice session, remembered on join
+            guild_id = self.voice_guild_id
+            if not guild_id and self.config.get("voice_channel_id"):
+                guild_id = self.resolve_guild(self.config["voice_channel_id"])
+            if guild_id:
+                # Send None as channel_id to leave voice channel
+                self.update_voice_state(guild_id, None)
             
             self.voice_connected = False
+            self.voice_guild_id = None
             return True
         except Exception:
             self.voice_connected = False
             return False
 
+    def _identify_payload(self, status: str) -> dict:
+        d = {
+            "token": self.token,
+            "properties": self.config.get("identify_properties") or DEFAULTS["identify_properties"],
+            "presence": {
+                "status": status,
+                "afk": False,
+                "since": 0,
+                "activities": []
+            },
+            "large_threshold": self.config.get("identify_large_threshold", 50),
+            # Per-payload compression can't be combined with zlib-stream
+            "compress": bool(self.config.get("identify_compress")) and not self.config.get("gateway_compress"),
+        }
+        # Only sent when configured, leaving them out keeps the server defaults
+        if self.config.get("identify_intents") is not None:
+            d["intents"] = self.config["identify_intents"]
+        if self.config.get("identify_capabilities") is not None:
+            d["capabilities"] = self.config["identify_capabilities"]
+        return {"op": 2, "d": d}
+
+    def _resume_payload(self) -> dict:
+        return {
+            "op": 6,
+            "d": {
+                "token": self.token,
+                "session_id": self.session_id,
+                "seq": self.sequence
+            }
+        }
+
+    def restore_session(self, session_id: str, sequence: int | None, resume_gateway_url: str | None):
+        """Continue a session another process started; the first connection will RESUME it"""
+        self.session_id = session_id
+        self.sequence = sequence
+        self.resume_gateway_url = resume_gateway_url
+
+    def session_snapshot(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "sequence": self.sequence,
+            "resume_gateway_url": self.resume_gateway_url,
+        }
+
+    def can_resume(self) -> bool:
+        return bool(self.session_id and self.sequence is not None)
+
+    def _invalidate_session(self):
+        self.session_id = None
+        self.sequence = None
+        self.resume_gateway_url = None
+
+    def register_dispatch(self, t: str, handler):
+        """Register a consumer for dispatch `t`; events without one are never fully decoded"""
+        previous = self.dispatch_handlers.get(t)
+        if previous is None:
+            self.dispatch_handlers[t] = handler
+        else:
+            def chained(d, first=previous, second=handler):
+                first(d)
+                second(d)
+            self.dispatch_handlers[t] = chained
+
+    def _on_ready(self, d: dict):
+        # Keep only compact records, the READY dict graph is dropped with the message
+        digest = digest_ready(d, self.channels)
+        self.session_id = digest.session.session_id
+        self.resume_gateway_url = digest.session.resume_gateway_url
+        if digest.user is not None:
+            self._set_user(digest.user)
+        # A new session is authoritative: no voice state in READY means we are not in voice
+        if digest.voice is not None and digest.voice.channel_id:
+            self.voice_state = digest.voice
+            self.voice_connected = True
+            self.voice_guild_id = digest.voice.guild_id
+        else:
+            self.voice_state = None
+            self.voice_connected = False
+        self.session_connected = True
+        if self.time_to_ready is None:
+            self.time_to_ready = time.perf_counter() - self._created
+        self.reconnect.connected()
+        self.sender.wake()
+        # Set initial presence
+        self.update_presence()
+        self._reconcile_voice()
+
+    def _on_resumed(self, d: dict):
+        # Missed events were replayed before this, session is caught up
+        self.session_connected = True
+        self.resume_count += 1
+        self.reconnect.connected()
+        self.sender.wake()
+        self._reconcile_voice()
+
+    def _on_voice_state_update(self, voice_data: dict):
+        # ETF delivers snowflakes as integers
+        if str(voice_data.get("user_id")) == self.userid:
+            self.voice_state = VoiceStateRecord.from_payload(voice_data)
+            self.voice_connected = voice_data.get("channel_id") is not None
+            self.channels.add(voice_data.get("channel_id"), voice_data.get("guild_id"))
+            if self.voice_connected and voice_data.get("guild_id") is not None:
+                self.voice_guild_id = str(voice_data["guild_id"])
+            self._check_voice(self.voice_state.channel_id)
+
+    def _desired_voice(self) -> tuple | None:
+        """(guild_id, channel_id) we should be in, guild_id may be None if never resolved"""
+        cid = self.config.get("voice_channel_id")
+        if not self.config.get("auto_join_voice") or not cid:
+            return None
+        return self.channels.get(cid) or self.config.get("voice_guild_id") or None, cid
+
+    def _reconcile_voice(self):
+        """Re-send op 4 if we are not where the config says we should be"""
+        desired = self._desired_voice()
+        if desired is None or not self.session_connected:
+            return
+        guild_id, channel_id = desired
+        if self.voice_state is not None and self.voice_state.channel_id == channel_id:
+            return
+        now = time.monotonic()
+        wait = self._voice_last_attempt + VOICE_REJOIN_INTERVAL - now
+        if wait > 0:
+            # Don't fight a moderator or another client over the channel
+            if self._voice_timer is None or not self._voice_timer.is_alive():
+                self._voice_timer = threading.Timer(wait, self._reconcile_voice)
+                self._voice_timer.daemon = True
+                self._voice_timer.start()
+            return
+        self._voice_last_attempt = now
+        if self._voice_rejoin_at is None:
+            self._voice_rejoin_at = now
+        self.voice_rejoins += 1
+        if guild_id:
+            if self.update_voice_state(guild_id, channel_id):
+                self.voice_connected = True
+                self.voice_guild_id = guild_id
+        else:
+            # Config from before guild ids were stored: one REST lookup, off the gateway thread
+            threading.Thread(target=self.join_voice_channel, args=(channel_id,), daemon=True).start()
+
+    def _check_voice(self, channel_id: str | None):
+        desired = self._desired_voice()
+        if desired is None:
+            return
+        if channel_id == desired[1]:
+            if self._voice_rejoin_at is not None:
+                self.voice_rejoin_latency.observe(time.monotonic() - self._voice_rejoin_at)
+                self._voice_rejoin_at = None
+            return
+        if channel_id is None:
+            self.voice_disconnected += 1
+        else:
+            self.voice_moved += 1
+        self._reconcile_voice()
+
+    def get_voice_stats(self) -> dict:
+        def ms(v):
+            return None if v is None else round(v * 1000, 1)
+        desired = self._desired_voice()
+        return {
+            "desired_channel": desired[1] if desired else None,
+            "channel": self.voice_state.channel_id if self.voice_state else None,
+            "rejoins": self.voice_rejoins,
+            "moved": self.voice_moved,
+            "disconnected": self.voice_disconnected,
+            "rejoin_p50_ms": ms(self.voice_rejoin_latency.percentile(50)),
+            "rejoin_last_ms": ms(self.voice_rejoin_latency.last),
+        }
+
+    def _count_inbound(self, op, t, size: int):
+        key = t if op == 0 else f"op:{op}"
+        self.inbound_counts[key] += 1
+        self.inbound_bytes[key] += size
+        self.inbound_total += 1
+
+    def get_inbound_stats(self) -> dict:
+        """Count and bytes per dispatch type ("op:N" for other opcodes), largest first"""
+        return {
+            key: {"count": self.inbound_counts[key], "bytes": size}
+            for key, size in self.inbound_bytes.most_common()
+        }
+
+    def _process_message(self, msg, size: int | None = None) -> str | None:
+        """Classify a raw message of `size` bytes and only fully decode it when something consumes it"""
+        if self.gateway_hook is not None:
+            self.gateway_hook()
+        if size is None:
+            size = len(msg)
+        timed = self.stages.enabled
+        if timed:
+            t0 = time.perf_counter()
+        head = None
+        if self.config.get("lazy_dispatch", True):
+            head = self.codec.peek(msg)
+            if head is not None:
+                op, seq, t = head
+                self._count_inbound(op, t, size)
+                if op == 0 and t not in self.dispatch_handlers:
+                    if seq is not None:
+                        self.sequence = seq
+                    self.skipped_events[t] += 1
+                    if timed:
+                        self.stages.observe("decode", time.perf_counter() - t0)
+                    return None
+        data = self._decode(msg)
+        if head is None:
+            self._count_inbound(data.get("op"), data.get("t"), size)
+        if not timed:
+            return self._handle_payload(data)
+        t1 = time.perf_counter()
+        self.stages.observe("decode", t1 - t0)
+        action = self._handle_payload(data)
+        self.stages.observe("dispatch", time.perf_counter() - t1)
+        return action
+
+    def _handle_payload(self, data: dict) -> str | None:
+        """Process one decoded gateway payload, returns "reconnect" when the connection must be dropped"""
+        op = data.get("op")
+        seq = data.get("s")
+        if seq is not None:
+            self.sequence = seq
+        
+        if op == 0:  # Dispatch event
+            handler = self.dispatch_handlers.get(data.get("t"))
+            if handler is not None:
+                handler(data["d"])
+                    
+        elif op == 1:  # Heartbeat request
+            self._send({"op": 1})
+        elif op == 7:  # Reconnect, the session stays resumable
+            return "reconnect"
+        elif op == 9:  # Invalid session, "d" tells whether it can be resumed
+            if not data.get("d"):
+                self._invalidate_session()
+                return "reidentify"
+            return "reconnect"
+        elif op == 11:  # Heartbeat ACK
+            self.heartbeat.ack()
+            last = self.heartbeat.latency.last
+            self.state.set("latency_ms", None if last is None else round(last * 1000, 1))
+        return None
+
     def _gateway_loop(self, status: str):
-        backoff = 1
+        # Imported here so startup doesn't pay for it before the thread starts
+        import websocket
         while self.monitoring_active:
+            resuming = self.can_resume()
+            reason, close_code = "error", None
+            closed = threading.Event()
             try:
                 self.ws = websocket.WebSocket()
-                self.ws.connect(GATEWAY_URL)
+                # A fresh inflate context per connection, the server resets its own
+                self.inflator = ZlibStreamInflator() if self.config.get("gateway_compress") else None
+                url = self.gateway_url(self.resume_gateway_url if resuming else None)
+                self.ws.connect(url)
+                if self.recorder is not None:
+                    self.recorder.opened(url)
                 
                 # Receive HELLO
-                hello_msg = json.loads(self.ws.recv())
+                hello = None
+                while hello is None:
+                    hello = self._recv_payload()
+                hello_msg = self._decode(hello)
                 if hello_msg["op"] != 10:  # Not a HELLO
-                    continue
+                    raise RuntimeError(f"Expected HELLO, got op {hello_msg['op']}")
                     
                 heartbeat_interval = hello_msg["d"]["heartbeat_interval"]
+                self.heartbeat.reset()
+                self.sender.connection_opened()
                 
                 # Start heartbeat in separate thread
                 self.heartbeat_thread = threading.Thread(
                     target=self.send_heartbeat, 
-                    args=(heartbeat_interval,),
+                    args=(heartbeat_interval, closed),
                     daemon=True
                 )
                 self.heartbeat_thread.start()
 
-                # Send IDENTIFY
-                identify = {
-                    "op": 2,
-                    "d": {
-                        "token": self.token,
-                        "properties": {
-                            "$os": "Windows 10", 
-                            "$browser": "Chrome", 
-                            "$device": "Windows"
-                        },
-                        "presence": {
-                            "status": status,
-                            "afk": False,
-                            "since": 0,
-                            "activities": []
-                        }
-                    }
-                }
-                self.ws.send(json.dumps(identify))
+                # RESUME picks up where the last connection left off, IDENTIFY starts over
+                if resuming:
+                    self._send(self._resume_payload())
+                else:
+                    self._send(self._identify_payload(status))
 
                 # Main message loop
+                reason = "closed"
                 while self.monitoring_active:
                     try:
-                        msg = self.ws.recv()
+                        msg = self._recv_payload()
                         if not msg:
                             continue
                             
-                        data = json.loads(msg)
-                        op = data.get("op")
-                        self.sequence = data.get("s")
-                        
-                        if op == 0:  # Dispatch event
-                            t = data.get("t")
-                            if t == "READY":
-                                self.session_connected = True
-                                self.session_id = data["d"].get("session_id")
-                                # Set initial presence
-                                self.update_presence()
-                            elif t == "VOICE_STATE_UPDATE":
-                                # Handle voice state updates
-                                voice_data = data["d"]
-                                if voice_data.get("user_id") == self.userid:
-                                    self.voice_connected = voice_data.get("channel_id") is not None
-                                    
-                        elif op == 1:  # Heartbeat request
-                            self.ws.send(json.dumps({"op": 1, "d": self.sequence}))
-                        elif op == 7:  # Reconnect
-                            break
-                        elif op == 9:  # Invalid session
-                            time.sleep(2)
+                        action = self._process_message(msg, self.message_size)
+                        # Don't hold a large frame (READY) until the next recv returns
+                        msg = None
+                        if action:
+                            reason = action
                             break
-                        elif op == 11:  # Heartbeat ACK
-                            pass  # Heartbeat acknowledged
                             
                     except websocket.WebSocketTimeoutException:
                         continue
+                    except ConnectionClosed as e:
+                        close_code = e.code
+                        if self.recorder is not None:
+                            self.recorder.closed(close_code)
+                        break
                     except websocket.WebSocketConnectionClosedException:
                         break
                     except Exception:
@@ -219,17 +721,40 @@ class DiscordBot:
                 print(f"Gateway error: {e}")
             finally:
                 self.session_connected = False
+                closed.set()
                 try:
                     if self.ws:
-                        self.ws.close()
+                        # Only stop() ends the session; anything else is resumed next
+                        self.ws.close(status=CLOSE_RESUMABLE if self.monitoring_active else CLOSE_NORMAL)
                 except Exception:
                     pass
                     
             if not self.monitoring_active:
                 break
                 
-            time.sleep(backoff)
-            backoff = min(backoff * 2, 30)
+            self.reconnect_count += 1
+            delay = self._reconnect_delay(reason, close_code)
+            if delay is None or (delay and not self.reconnect.sleep(delay)):
+                break
+
+    def _reconnect_delay(self, reason: str, close_code: int | None) -> float | None:
+        """Shared by both engines: how long to wait, None when reconnecting cannot help"""
+        if self.heartbeat.consume_zombie():
+            # A missed ACK is not an outage
+            reason = "zombie"
+        if self.reconnect.needs_identify(close_code):
+            self._invalidate_session()
+        if close_code == CLOSE_AUTHENTICATION_FAILED:
+            # Don't let a cached identity vouch for a token the gateway rejected
+            self.identity.discard(self.token)
+        delay = self.reconnect.next_delay(reason, close_code)
+        if delay is None:
+            self.state.set("gateway_fatal", self.reconnect.fatal)
+            print(f"Gateway closed the session: {self.reconnect.fatal}; not reconnecting")
+        return delay
+
+    def get_reconnect_stats(self) -> dict:
+        return self.reconnect.stats()
 
     def update_presence(self):
         """Update bot presence with current config"""
@@ -255,13 +780,77 @@ class DiscordBot:
         }
         
         try:
-            self.ws.send(json.dumps(presence))
+            if self._send(presence):
+                self.state.update({"status": presence["d"]["status"], "custom_status": self.config.get("custom_status", "")})
         except Exception:
             pass
 
+    def start_exporter(self):
+        """Serve OpenMetrics on `metrics_exporter` ("host:port"); nothing is imported when unset"""
+        bind = self.config.get("metrics_exporter")
+        if not bind or self.exporter is not None:
+            return
+        from .exporter import MetricsExporter
+        try:
+            self.exporter = MetricsExporter(self, bind)
+            self.exporter.start()
+        except (OSError, ValueError) as e:
+            self.exporter = None
+            print(f"Metrics exporter failed to start on {bind}: {e}")
+
+    def start_recorder(self):
+        """Record gateway traffic to `record_path` for later replay; off when unset"""
+        path = self.config.get("record_path")
+        if not path or self.recorder is not None:
+            return
+        from .recorder import TrafficRecorder
+        self.recorder = TrafficRecorder(
+            Path(path),
+            encoding=self.codec.encoding,
+            max_bytes=int(self.config.get("record_max_mb", 64) * 1048576),
+            max_files=int(self.config.get("record_max_files", 4)),
+        )
+
+    def start_profile(self, kind: str = "cpu", seconds: float = 10.0) -> str:
+        """Capture a cProfile ("cpu") or tracemalloc ("memory") report for `seconds`; returns its path"""
+        capture = self.capture
+        if capture is not None and not capture.done.is_set() and time.monotonic() < capture.deadline:
+            raise RuntimeError(f"a {capture.kind} capture is already running")
+        directory = self.config.get("profile_dir") or Path(self.config_path).parent / "profiles"
+        self.capture = start_capture(self, kind, float(seconds), Path(directory))
+        return str(self.capture.path)
+
+    def set_instrumentation(self, enabled: bool):
+        """Turn per-stage timers on or off while running; histograms restart when turned on"""
+        if enabled and not self.stages.enabled:
+            self.stages.reset()
+        self.stages.enabled = enabled
+        self.config["instrument_stages"] = enabled
+
+    def get_stage_stats(self) -> dict:
+        return self.stages.stats()
+
+    def get_send_queue_depth(self) -> int:
+        """Outbound payloads queued in the scheduler or handed to the asyncio loop"""
+        return self.sender.depth() + (getattr(self.ws, "pending", 0) if self.ws is not None else 0)
+
+    def get_send_stats(self) -> dict:
+        return self.sender.stats()
+
     def start_presence(self):
         if self._presence_thread and self._presence_thread.is_alive():
             return
+        if self._engine and self._engine.is_alive():
+            return
+        self.config.watch()
+        self.metrics.start()
+        self.start_exporter()
+        self.start_recorder()
+        if self.config.get("gateway_engine") == "asyncio":
+            from .aio_gateway import AsyncGatewayEngine
+            self._engine = AsyncGatewayEngine(self)
+            self._engine.start(self.config.get("status", "online"))
+            return
         self._presence_thread = threading.Thread(
             target=self._gateway_loop, 
             args=(self.config.get("status", "online"),), 
@@ -271,12 +860,39 @@ class DiscordBot:
 
     def stop(self):
         self.monitoring_active = False
+        self.reconnect.interrupt()
+        self.metrics.stop()
+        if self.exporter:
+            self.exporter.stop()
+            self.exporter = None
         self.leave_voice_channel()
+        if self.ws and self.ws.connected:
+            # Let the voice leave go out before the socket closes
+            self.sender.flush(2)
+        self.sender.stop()
+        if self._engine:
+            self._engine.stop()
         try:
             if self.ws:
                 self.ws.close()
         except Exception:
             pass
+        if self.recorder is not None:
+            self.recorder.close()
+        self.config.flush()
+
+    def _on_config_changed(self, changed: dict):
+        """Apply edits made to the config file while running"""
+        if "status" in changed or "custom_status" in changed:
+            self.update_presence()
+        if "instrument_stages" in changed:
+            self.stages.enabled = bool(self.config.get("instrument_stages"))
+        if "auto_join_voice" in changed or "voice_channel_id" in changed:
+            cid = self.config.get("voice_channel_id")
+            if self.config.get("auto_join_voice") and cid:
+                self.join_voice_channel(cid)
+            elif self.voice_connected:
+                self.leave_voice_channel()
 
     def toggle_voice(self, channel_id: str | None = None) -> str:
         if not self.config.get("auto_join_voice"):
@@ -289,7 +905,7 @@ class DiscordBot:
             if ok:
                 self.config["auto_join_voice"] = True
                 self.config["voice_channel_id"] = cid
-                save_config(self.config_path, self.config)
+                self.config["voice_guild_id"] = self.voice_guild_id or ""
                 return "connected"
             return "failed"
         
@@ -297,6 +913,6 @@ class DiscordBot:
             self.config["auto_join_voice"] = False
             old_channel_id = self.config.get("voice_channel_id", "")
             self.config["voice_channel_id"] = ""
-            save_config(self.config_path, self.config)
+            self.config["voice_guild_id"] = ""
             self.leave_voice_channel()
             return "disabled"
\ No newline at end of file
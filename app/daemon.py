@@ -0,0 +1,44 @@
+import os
+import signal
+import threading
+from pathlib import Path
+from .core import DiscordBot
+from .control import ControlServer, default_socket_path
+
+
+def run_daemon(token: str, config_path: Path, socket_path: Path | None = None) -> int:
+    """Run the gateway session with no TUI until `stop` arrives on the control socket or a signal"""
+    if not token:
+        print("DISCORD_TOKEN is not set; the daemon cannot prompt for it")
+        return 1
+    bot = DiscordBot(token, config_path)
+    stopped = threading.Event()
+    server = ControlServer(bot, socket_path or default_socket_path(config_path), on_stop=stopped.set)
+    try:
+        server.start()
+    except (OSError, RuntimeError) as e:
+        print(f"Control socket unavailable: {e}")
+        return 1
+    try:
+        bot.login()
+    except Exception as e:
+        server.stop()
+        print(f"Login failed: {e}")
+        return 1
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda signum, frame: stopped.set())
+    print(f"Logged in as {bot.username}, control socket {server.path}")
+    try:
+        stopped.wait()
+    finally:
+        server.stop()
+        bot.stop()
+    return 0
+
+
+def main(project_root: Path, socket_path: str | None = None) -> int:
+    return run_daemon(
+        os.getenv("DISCORD_TOKEN") or "",
+        project_root / "config.json",
+        Path(socket_path) if socket_path else None,
+    )
@@ -0,0 +1,168 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _snapshot(counter) -> dict:
+    # The gateway thread may add a key mid-copy; just try again
+    for _ in range(5):
+        try:
+            return dict(counter)
+        except RuntimeError:
+            continue
+    return {}
+
+
+def _number(value) -> str:
+    if isinstance(value, float):
+        return repr(value)
+    return str(int(value))
+
+
+class OpenMetricsWriter:
+    """Builds an OpenMetrics text exposition one metric family at a time"""
+
+    def __init__(self):
+        self.lines = []
+
+    def family(self, name: str, kind: str, help: str, unit: str = ""):
+        self.lines.append(f"# TYPE {name} {kind}")
+        if unit:
+            self.lines.append(f"# UNIT {name} {unit}")
+        self.lines.append(f"# HELP {name} {help}")
+
+    def sample(self, name: str, value, labels: dict | None = None):
+        if labels:
+            inner = ",".join(f'{k}="{_label(v)}"' for k, v in labels.items())
+            name = f"{name}{{{inner}}}"
+        self.lines.append(f"{name} {_number(value)}")
+
+    def histogram(self, name: str, hist, labels: dict | None = None):
+        """Cumulative buckets from a `LatencyHistogram`"""
+        labels = labels or {}
+        cumulative = 0
+        counts = list(hist.bucket_counts)
+        for bound, count in zip(hist.bounds, counts):
+            cumulative += count
+            self.sample(f"{name}_bucket", cumulative, {**labels, "le": repr(float(bound))})
+        cumulative += counts[-1]
+        self.sample(f"{name}_bucket", cumulative, {**labels, "le": "+Inf"})
+        self.sample(f"{name}_count", cumulative, labels)
+        self.sample(f"{name}_sum", float(hist.sum), labels)
+
+    def text(self) -> str:
+        return "\n".join(self.lines + ["# EOF", ""])
+
+
+def render_metrics(bot) -> str:
+    w = OpenMetricsWriter()
+    w.family("discord_session_connected", "gauge", "1 while the gateway session is READY or RESUMED")
+    w.sample("discord_session_connected", bool(bot.session_connected))
+    w.family("discord_voice_connected", "gauge", "1 while our user is in a voice channel")
+    w.sample("discord_voice_connected", bool(bot.voice_connected))
+    w.family("discord_voice_rejoins", "counter", "op 4 voice state updates sent to restore the configured channel")
+    w.sample("discord_voice_rejoins_total", bot.voice_rejoins)
+    w.family("discord_voice_rejoin_duration_seconds", "histogram", "Time from a voice rejoin to the confirming VOICE_STATE_UPDATE", "seconds")
+    w.histogram("discord_voice_rejoin_duration_seconds", bot.voice_rejoin_latency)
+    w.family("discord_reconnects", "counter", "Gateway reconnect attempts")
+    w.sample("discord_reconnects_total", bot.reconnect_count)
+    w.family("discord_resumes", "counter", "Sessions successfully resumed")
+    w.sample("discord_resumes_total", bot.resume_count)
+    w.family("discord_reconnect_duration_seconds", "histogram", "Time from losing the session to READY/RESUMED", "seconds")
+    w.histogram("discord_reconnect_duration_seconds", bot.reconnect.time_to_reconnect)
+    w.family("discord_gateway_fatal", "gauge", "1 once a fatal close code or repeated auth failures stopped reconnecting")
+    w.sample("discord_gateway_fatal", bot.reconnect.fatal is not None)
+
+    counts, sizes = _snapshot(bot.inbound_counts), _snapshot(bot.inbound_bytes)
+    w.family("discord_inbound_events", "counter", "Gateway payloads received by dispatch type or opcode")
+    for key, count in sorted(counts.items()):
+        w.sample("discord_inbound_events_total", count, {"type": key})
+    w.family("discord_inbound_bytes", "counter", "Decompressed gateway bytes received by dispatch type or opcode", "bytes")
+    for key, size in sorted(sizes.items()):
+        w.sample("discord_inbound_bytes_total", size, {"type": key})
+
+    w.family("discord_heartbeat_rtt_seconds", "histogram", "Heartbeat to ACK round trip", "seconds")
+    w.histogram("discord_heartbeat_rtt_seconds", bot.heartbeat.latency)
+    w.family("discord_heartbeat_zombies", "counter", "Heartbeats that were never ACKed")
+    w.sample("discord_heartbeat_zombies_total", bot.heartbeat.zombie_count)
+
+    w.family("discord_rest_request_duration_seconds", "histogram", "REST request latency by route", "seconds")
+    for route, hist in sorted(_snapshot(bot.rest.latency).items()):
+        w.histogram("discord_rest_request_duration_seconds", hist, {"route": route})
+    w.family("discord_rest_ratelimited", "counter", "REST responses with status 429")
+    w.sample("discord_rest_ratelimited_total", bot.rest.ratelimited)
+
+    w.family("discord_send_queue_depth", "gauge", "Outbound gateway payloads not yet written to the socket")
+    w.sample("discord_send_queue_depth", bot.get_send_queue_depth())
+    w.family("discord_send_wait_seconds", "histogram", "Time outbound payloads spent queued before being written", "seconds")
+    w.histogram("discord_send_wait_seconds", bot.sender.wait)
+    w.family("discord_sent_payloads", "counter", "Outbound gateway payloads written")
+    w.sample("discord_sent_payloads_total", bot.sender.sent)
+    w.family("discord_send_coalesced", "counter", "Queued presence, voice state or heartbeat payloads replaced by a newer one")
+    w.sample("discord_send_coalesced_total", bot.sender.coalesced)
+
+    if bot.stages.enabled:
+        w.family("discord_stage_seconds", "histogram", "Time per gateway stage: recv, decode, dispatch, encode, send", "seconds")
+        for stage, hist in bot.stages.hist.items():
+            w.histogram("discord_stage_seconds", hist, {"stage": stage})
+
+    sample = bot.metrics.latest or bot.metrics.sample()
+    w.family("process_resident_memory_bytes", "gauge", "Resident set size", "bytes")
+    w.sample("process_resident_memory_bytes", int(sample["rss_mb"] * 1048576))
+    w.family("process_cpu_percent", "gauge", "CPU use over the last sample interval")
+    w.sample("process_cpu_percent", float(sample["cpu_percent"]))
+    w.family("process_threads", "gauge", "OS threads in the process")
+    w.sample("process_threads", sample["threads"])
+    return w.text()
+
+
+class MetricsExporter:
+    """Serves `render_metrics(bot)` over HTTP at /metrics on a daemon thread"""
+
+    def __init__(self, bot, bind: str):
+        host, _, port = bind.rpartition(":")
+        self.bot = bot
+        self.address = (host or "127.0.0.1", int(port))
+        self.server = None
+        self.scrapes = 0
+        self._thread = None
+
+    def start(self):
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                try:
+                    body = render_metrics(exporter.bot).encode("utf-8")
+                except Exception as e:
+                    self.send_error(500, str(e))
+                    return
+                exporter.scrapes += 1
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(self.address, Handler)
+        self.server.daemon_threads = True
+        self.address = self.server.server_address[:2]
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
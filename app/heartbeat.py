@@ -0,0 +1,96 @@
+import time
+import random
+from collections import deque
+
+# Upper bounds (seconds) of the cumulative latency buckets
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    """Rolling window of latency samples plus all-time cumulative buckets"""
+
+    def __init__(self, window: int = 256, buckets=LATENCY_BUCKETS):
+        self.samples = deque(maxlen=window)
+        self.bounds = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.samples.append(value)
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+        else:
+            self.bucket_counts[-1] += 1
+
+    def percentile(self, q: float) -> float | None:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        idx = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+        return ordered[idx]
+
+    @property
+    def last(self) -> float | None:
+        return self.samples[-1] if self.samples else None
+
+
+class HeartbeatTracker:
+    """Tracks op 1 sends against op 11 ACKs for one gateway session"""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.last_sent = None
+        self.last_ack = None
+        self.acked = True
+        self.zombie_count = 0
+        self.zombie = False
+
+    def reset(self):
+        """Start of a new connection, nothing is outstanding yet"""
+        self.last_sent = None
+        self.acked = True
+        self.zombie = False
+
+    @staticmethod
+    def first_delay(interval_ms: float) -> float:
+        """First beat waits interval * jitter, as the gateway docs specify"""
+        return interval_ms * random.random() / 1000.0
+
+    def sent(self):
+        self.last_sent = time.monotonic()
+        self.acked = False
+
+    def ack(self):
+        now = time.monotonic()
+        if self.last_sent is not None and not self.acked:
+            self.latency.observe(now - self.last_sent)
+        self.last_ack = now
+        self.acked = True
+
+    def check(self) -> bool:
+        """Call before each beat, False means the previous beat was never ACKed"""
+        if self.acked:
+            return True
+        self.zombie = True
+        self.zombie_count += 1
+        return False
+
+    def consume_zombie(self) -> bool:
+        """True once after a zombie disconnect, so only that reconnect skips the backoff"""
+        zombie, self.zombie = self.zombie, False
+        return zombie
+
+    def stats(self) -> dict:
+        def ms(v):
+            return None if v is None else round(v * 1000, 1)
+        return {
+            "p50_ms": ms(self.latency.percentile(50)),
+            "p99_ms": ms(self.latency.percentile(99)),
+            "last_ms": ms(self.latency.last),
+            "zombies": self.zombie_count,
+        }
@@ -0,0 +1,55 @@
+import json
+import time
+import hashlib
+from pathlib import Path
+from .config import save_config
+
+# Only what UserRecord needs; email, phone and the like never touch the disk
+USER_FIELDS = ("id", "username", "discriminator", "global_name")
+
+
+class IdentityCache:
+    """`/users/@me` results on disk keyed by a hash of the token, so restarts skip the round trip"""
+
+    def __init__(self, path: Path, ttl: float = 3600):
+        self.path = Path(path)
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def _load(self) -> dict:
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, token: str) -> dict | None:
+        if not token or self.ttl <= 0:
+            return None
+        entry = self._load().get(self._key(token))
+        if not entry or time.time() - entry.get("at", 0) > self.ttl:
+            return None
+        return entry.get("user")
+
+    def put(self, token: str, user: dict):
+        if self.ttl <= 0:
+            return
+        now = time.time()
+        # Drop expired entries (old tokens) while we are rewriting anyway
+        data = {k: v for k, v in self._load().items() if now - v.get("at", 0) <= self.ttl}
+        data[self._key(token)] = {"at": now, "user": {k: user[k] for k in USER_FIELDS if k in user}}
+        try:
+            save_config(self.path, data)
+        except OSError as e:
+            print(f"Could not write identity cache {self.path}: {e}")
+
+    def discard(self, token: str):
+        data = self._load()
+        if data.pop(self._key(token), None) is not None:
+            try:
+                save_config(self.path, data)
+            except OSError:
+                pass
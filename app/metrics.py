@@ -0,0 +1,135 @@
+import os
+import math
+import time
+import threading
+from array import array
+
+SPARK = "▁▂▃▄▅▆▇█"
+
+
+class RingBuffer:
+    """Fixed number of float samples in a preallocated array, oldest overwritten first"""
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, int(capacity))
+        self._data = array("d", bytes(8 * self.capacity))
+        self._next = 0
+        self._len = 0
+
+    def append(self, value: float):
+        self._data[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        if self._len < self.capacity:
+            self._len += 1
+
+    def __len__(self) -> int:
+        return self._len
+
+    def values(self) -> list:
+        """Samples oldest first"""
+        if self._len < self.capacity:
+            return self._data[:self._len].tolist()
+        return (self._data[self._next:] + self._data[:self._next]).tolist()
+
+    def last(self) -> float | None:
+        if not self._len:
+            return None
+        return self._data[self._next - 1]
+
+    def summary(self) -> dict:
+        """min/avg/max/last over the window, skipping gaps (NaN)"""
+        vals = [v for v in self.values() if not math.isnan(v)]
+        if not vals:
+            return {"min": None, "avg": None, "max": None, "last": None}
+        return {"min": min(vals), "avg": sum(vals) / len(vals), "max": max(vals), "last": vals[-1]}
+
+    def sparkline(self, width: int) -> str:
+        vals = self.values()[-width:] if width > 0 else []
+        known = [v for v in vals if not math.isnan(v)]
+        if not known:
+            return " " * len(vals)
+        lo, hi = min(known), max(known)
+        span = (hi - lo) or 1.0
+        top = len(SPARK) - 1
+        return "".join(" " if math.isnan(v) else SPARK[round((v - lo) / span * top)] for v in vals)
+
+
+class MetricsSampler:
+    """Samples process and gateway metrics on a background thread into ring buffers.
+
+    One `psutil.Process` handle is kept for the process lifetime and CPU is
+    read as a delta since the previous sample, so nothing ever blocks the UI.
+    """
+    SERIES = ("rss_mb", "cpu_percent", "threads", "fds", "latency_ms", "events_per_sec")
+
+    def __init__(self, bot, interval: float = 1.0, window: int = 300):
+        self.bot = bot
+        self.interval = interval
+        self.series = {name: RingBuffer(window) for name in self.SERIES}
+        self.latest = {}
+        self._process = None
+        self._last_events = None
+        self._last_time = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while True:
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"Metrics sample error: {e}")
+            if self._stop.wait(self.interval):
+                return
+
+    def sample(self) -> dict:
+        with self._lock:
+            return self._sample()
+
+    def _sample(self) -> dict:
+        if self._process is None:
+            import psutil
+            self._process = psutil.Process()
+            # First call only primes the CPU counters
+            self._process.cpu_percent(None)
+        p = self._process
+        with p.oneshot():
+            rss = p.memory_info().rss
+            cpu = p.cpu_percent(None)
+            threads = p.num_threads()
+            fds = p.num_handles() if os.name == "nt" else p.num_fds()
+        now = time.monotonic()
+        events = self.bot.inbound_total
+        if self._last_time is None or now <= self._last_time:
+            rate = math.nan
+        else:
+            rate = (events - self._last_events) / (now - self._last_time)
+        self._last_events, self._last_time = events, now
+        last_ms = self.bot.heartbeat.stats()["last_ms"]
+        sample = {
+            "rss_mb": rss / 1048576,
+            "cpu_percent": cpu,
+            "threads": threads,
+            "fds": fds,
+            "latency_ms": math.nan if last_ms is None else last_ms,
+            "events_per_sec": rate,
+        }
+        for name, value in sample.items():
+            self.series[name].append(value)
+        self.latest = sample
+        self.bot.state.set("stats", sample)
+        return sample
+
+    def summary(self) -> dict:
+        return {name: buf.summary() for name, buf in self.series.items()}
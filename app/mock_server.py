@@ -0,0 +1,450 @@
+import json
+import time
+import uuid
+import zlib
+import random
+import asyncio
+import argparse
+import threading
+from collections import Counter, deque
+from urllib.parse import urlsplit, parse_qs
+from .codec import get_codec, OPCODE_BINARY
+from .wsproto import (
+    ConnectionClosed, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG,
+    accept_key, encode_frame, close_payload, parse_close, read_frame, read_http_head,
+)
+
+MOCK_USER = {"id": "424242424242424242", "username": "mockuser", "discriminator": "0", "global_name": "Mock User"}
+GUILD_BASE = 100000
+
+
+def channel_guild(channel_id: str) -> str:
+    """Channel ids are generated as guild_id * 10000 + n"""
+    return str(int(channel_id) // 10000)
+
+
+class GatewayConnection:
+    def __init__(self, server: "MockDiscord", reader, writer, encoding: str, compress: bool):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.codec = get_codec(encoding)
+        self.deflate = zlib.compressobj() if compress else None
+        self.session = None
+        self.open = True
+
+    def send(self, payload: dict):
+        if not self.open or self.writer.is_closing():
+            return
+        data = self.codec.encode(payload)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        opcode = OP_BINARY if self.codec.opcode == OPCODE_BINARY else OP_TEXT
+        if self.deflate is not None:
+            data = self.deflate.compress(data) + self.deflate.flush(zlib.Z_SYNC_FLUSH)
+            opcode = OP_BINARY
+        self.server.stats["frames_out"] += 1
+        self.server.stats["bytes_out"] += len(data)
+        self.writer.write(encode_frame(opcode, data, mask=False))
+
+    def dispatch(self, t: str, d, record: bool = True):
+        """Send a sequenced op 0 event, kept for replay on RESUME"""
+        session = self.session
+        if session is None:
+            return
+        session["seq"] += 1
+        payload = {"t": t, "s": session["seq"], "op": 0, "d": d}
+        if record:
+            session["buffer"].append(payload)
+        self.send(payload)
+        if self.server.drop_rate and random.random() < self.server.drop_rate:
+            self.abort()
+
+    def close(self, code: int = 1000):
+        if self.open and not self.writer.is_closing():
+            self.writer.write(encode_frame(OP_CLOSE, close_payload(code), mask=False))
+            self.open = False
+            # Wait for the client's close reply like the real gateway; dropping TCP with
+            # unread client frames sends a reset that can discard the close frame
+            asyncio.get_running_loop().call_later(1.0, self.writer.close)
+            return
+        self.open = False
+        self.writer.close()
+
+    def abort(self):
+        self.open = False
+        self.writer.transport.abort()
+
+
+class MockDiscord:
+    """Local stand-in for the Discord gateway and the REST routes the client uses.
+
+    Every knob is a plain attribute and can be changed while running:
+
+    - `heartbeat_interval` (ms) sent in HELLO, `ack_heartbeats` to simulate zombies
+    - `guilds` / `channels_per_guild` control the READY size
+    - `rest_latency` (s), `rest_drop_rate`, `rest_429_every` script REST misbehaviour
+    - `drop_rate` aborts the gateway socket after a dispatch with that probability
+    - `storm_rate` (events/s, 0 = off) and `storm_size` (bytes of padding) run a
+      continuous MESSAGE_CREATE storm on every connection
+    """
+
+    def __init__(self, host: str = "127.0.0.1", gateway_port: int = 0, api_port: int = 0, **options):
+        self.host = host
+        self.gateway_port = gateway_port
+        self.api_port = api_port
+        self.heartbeat_interval = 41250
+        self.ack_heartbeats = True
+        self.guilds = 10
+        self.channels_per_guild = 20
+        self.rest_latency = 0.0
+        self.rest_drop_rate = 0.0
+        self.rest_429_every = 0
+        self.drop_rate = 0.0
+        self.storm_rate = 0
+        self.storm_size = 200
+        for key, value in options.items():
+            if not hasattr(self, key):
+                raise TypeError(f"Unknown mock option: {key}")
+            setattr(self, key, value)
+        self.loop = None
+        self.thread = None
+        self.connections = set()
+        self.sessions = {}
+        self.stats = Counter()
+        self.received = deque(maxlen=1000)
+        self._ready = threading.Event()
+        self._servers = []
+
+    # Lifecycle
+
+    @property
+    def gateway_url(self) -> str:
+        return f"ws://{self.host}:{self.gateway_port}"
+
+    @property
+    def api_url(self) -> str:
+        return f"http://{self.host}:{self.api_port}/api/v9"
+
+    def start(self) -> "MockDiscord":
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self._ready.wait(10)
+        return self
+
+    def stop(self):
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread is not None:
+            self.thread.join(5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        gw = self.loop.run_until_complete(asyncio.start_server(self._gateway_client, self.host, self.gateway_port))
+        api = self.loop.run_until_complete(asyncio.start_server(self._rest_client, self.host, self.api_port))
+        self._servers = [gw, api]
+        self.gateway_port = gw.sockets[0].getsockname()[1]
+        self.api_port = api.sockets[0].getsockname()[1]
+        storm = self.loop.create_task(self._storm_loop())
+        self._ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            storm.cancel()
+            for conn in list(self.connections):
+                conn.abort()
+            for srv in self._servers:
+                srv.close()
+            pending = asyncio.all_tasks(self.loop)
+            for task in pending:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self.loop.close()
+
+    def _call(self, fn, *args):
+        """Run `fn` on the server loop from any thread"""
+        self.loop.call_soon_threadsafe(fn, *args)
+
+    # Scripting, callable from any thread
+
+    def reconnect(self):
+        """op 7 on every connection"""
+        self._call(self._each, lambda c: c.send({"op": 7, "d": None}))
+
+    def invalidate(self, resumable: bool = False):
+        """op 9 on every connection"""
+        def invalidate(conn):
+            if not resumable and conn.session is not None:
+                self.sessions.pop(conn.session["id"], None)
+            conn.send({"op": 9, "d": resumable})
+        self._call(self._each, invalidate)
+
+    def drop(self):
+        """Abort every gateway socket without a close frame"""
+        self._call(self._each, lambda c: c.abort())
+
+    def close(self, code: int):
+        """Close every gateway socket with `code`"""
+        self._call(self._each, lambda c: c.close(code))
+
+    def storm(self, count: int, t: str = "MESSAGE_CREATE", size: int | None = None, rate: float | None = None):
+        """Send `count` dispatches to every connection, as fast as possible or at `rate`/s"""
+        asyncio.run_coroutine_threadsafe(self._storm(count, t, size, rate), self.loop)
+
+    def _each(self, fn):
+        for conn in list(self.connections):
+            fn(conn)
+
+    # Gateway
+
+    def _event(self, t: str, size: int | None) -> dict:
+        n = self.stats["storm_events"]
+        return {
+            "id": str(10**17 + n),
+            "channel_id": str(GUILD_BASE * 10000),
+            "guild_id": str(GUILD_BASE),
+            "author": {"id": "1", "username": "storm"},
+            "content": "x" * (self.storm_size if size is None else size),
+            "type": 0,
+        } if t == "MESSAGE_CREATE" else {"padding": "x" * (self.storm_size if size is None else size)}
+
+    async def _storm(self, count: int, t: str, size: int | None, rate: float | None):
+        delay = 1 / rate if rate else 0
+        for i in range(count):
+            payload = self._event(t, size)
+            self.stats["storm_events"] += 1
+            for conn in list(self.connections):
+                conn.dispatch(t, payload, record=False)
+            if delay:
+                await asyncio.sleep(delay)
+            elif i % 256 == 255:
+                # Let the writers drain
+                for conn in list(self.connections):
+                    try:
+                        await conn.writer.drain()
+                    except ConnectionError:
+                        pass
+
+    async def _storm_loop(self):
+        while True:
+            if self.storm_rate and self.connections:
+                batch = max(1, int(self.storm_rate / 20))
+                await self._storm(batch, "MESSAGE_CREATE", None, None)
+                await asyncio.sleep(batch / self.storm_rate)
+            else:
+                await asyncio.sleep(0.05)
+
+    def _ready_payload(self, session_id: str) -> dict:
+        guilds = []
+        for g in range(self.guilds):
+            guild_id = GUILD_BASE + g
+            guilds.append({
+                "id": str(guild_id),
+                "name": f"Guild {g}",
+                "channels": [
+                    {"id": str(guild_id * 10000 + c), "type": 2 if c % 4 == 0 else 0, "name": f"channel-{c}"}
+                    for c in range(self.channels_per_guild)
+                ],
+                "voice_states": [],
+            })
+        return {
+            "v": 9,
+            "user": MOCK_USER,
+            "session_id": session_id,
+            "resume_gateway_url": self.gateway_url,
+            "guilds": guilds,
+        }
+
+    async def _gateway_client(self, reader, writer):
+        try:
+            line, headers = await read_http_head(reader)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            writer.close()
+            return
+        query = parse_qs(urlsplit(line.split(" ")[1]).query)
+        writer.write((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept_key(headers.get('sec-websocket-key', ''))}\r\n\r\n"
+        ).encode("latin-1"))
+        conn = GatewayConnection(
+            self, reader, writer,
+            query.get("encoding", ["json"])[0],
+            query.get("compress", [""])[0] == "zlib-stream",
+        )
+        self.connections.add(conn)
+        self.stats["connections"] += 1
+        conn.send({"op": 10, "d": {"heartbeat_interval": self.heartbeat_interval}, "s": None, "t": None})
+        try:
+            await self._gateway_session(conn)
+        except (ConnectionClosed, asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            # Cancellation only happens on shutdown, end quietly
+            pass
+        finally:
+            self.connections.discard(conn)
+            conn.open = False
+            writer.close()
+
+    async def _gateway_session(self, conn: GatewayConnection):
+        chunks = []
+        while True:
+            fin, opcode, data = await read_frame(conn.reader)
+            if opcode == OP_CLOSE:
+                code, _ = parse_close(data)
+                self.stats[f"client_close:{code}"] += 1
+                # Like the real gateway, a normal close ends the session
+                if code in (1000, 1001) and conn.session is not None:
+                    self.sessions.pop(conn.session["id"], None)
+                conn.close(code or 1000)
+                return
+            if opcode == OP_PING:
+                conn.writer.write(encode_frame(OP_PONG, data, mask=False))
+                continue
+            if opcode in (OP_PONG,):
+                continue
+            chunks.append(data)
+            if not fin:
+                continue
+            raw = b"".join(chunks)
+            chunks = []
+            payload = conn.codec.decode(raw if conn.codec.opcode == OPCODE_BINARY else raw.decode("utf-8"))
+            self._handle_op(conn, payload)
+
+    def _handle_op(self, conn: GatewayConnection, payload: dict):
+        op = payload.get("op")
+        d = payload.get("d")
+        self.stats[f"op:{op}"] += 1
+        self.received.append((time.monotonic(), op, d if op != 2 and op != 6 else None))
+        if op == 1:
+            if self.ack_heartbeats:
+                conn.send({"op": 11, "d": None, "s": None, "t": None})
+        elif op == 2:
+            session_id = uuid.uuid4().hex
+            conn.session = self.sessions[session_id] = {"id": session_id, "seq": 0, "buffer": deque(maxlen=1000)}
+            conn.dispatch("READY", self._ready_payload(session_id), record=False)
+        elif op == 6:
+            session = self.sessions.get(str(d.get("session_id")))
+            seq = d.get("seq") or 0
+            if session is None or seq > session["seq"]:
+                conn.send({"op": 9, "d": False, "s": None, "t": None})
+                return
+            conn.session = session
+            self.stats["resumes"] += 1
+            for event in list(session["buffer"]):
+                if event["s"] > seq:
+                    conn.send(event)
+            conn.dispatch("RESUMED", {}, record=False)
+        elif op == 4:
+            conn.dispatch("VOICE_STATE_UPDATE", {
+                "user_id": MOCK_USER["id"],
+                "guild_id": d.get("guild_id"),
+                "channel_id": d.get("channel_id"),
+                "self_mute": d.get("self_mute", False),
+                "self_deaf": d.get("self_deaf", False),
+                "session_id": conn.session["id"] if conn.session else None,
+            })
+
+    # REST
+
+    async def _rest_client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    line, headers = await read_http_head(reader)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    return
+                length = int(headers.get("content-length") or 0)
+                if length:
+                    await reader.readexactly(length)
+                self.stats["rest_requests"] += 1
+                if self.rest_latency:
+                    await asyncio.sleep(self.rest_latency)
+                if self.rest_drop_rate and random.random() < self.rest_drop_rate:
+                    self.stats["rest_dropped"] += 1
+                    writer.transport.abort()
+                    return
+                status, body, extra = self._rest_route(line, headers)
+                raw = json.dumps(body).encode("utf-8")
+                head = f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(raw)}\r\n"
+                for name, value in extra.items():
+                    head += f"{name}: {value}\r\n"
+                writer.write(head.encode("latin-1") + b"\r\n" + raw)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    def _rest_route(self, line: str, headers: dict) -> tuple[str, dict, dict]:
+        method, target = line.split(" ")[:2]
+        path = urlsplit(target).path
+        if path.startswith("/api/v9"):
+            path = path[len("/api/v9"):]
+        limits = {"X-RateLimit-Bucket": path.split("/")[1] if "/" in path else "root",
+                  "X-RateLimit-Limit": "5", "X-RateLimit-Remaining": "4", "X-RateLimit-Reset-After": "1.0"}
+        if self.rest_429_every and self.stats["rest_requests"] % self.rest_429_every == 0:
+            self.stats["rest_429"] += 1
+            limits["X-RateLimit-Remaining"] = "0"
+            return "429 Too Many Requests", {"message": "You are being rate limited.", "retry_after": 0.25, "global": False}, limits
+        token = headers.get("authorization", "")
+        if not token or token == "invalid":
+            return "401 Unauthorized", {"message": "401: Unauthorized", "code": 0}, {}
+        if method == "GET" and path == "/users/@me":
+            return "200 OK", MOCK_USER, limits
+        if method == "GET" and path.startswith("/channels/"):
+            channel_id = path.split("/")[2]
+            if not channel_id.isdigit():
+                return "404 Not Found", {"message": "Unknown Channel", "code": 10003}, limits
+            return "200 OK", {"id": channel_id, "type": 2, "guild_id": channel_guild(channel_id)}, limits
+        return "404 Not Found", {"message": "404: Not Found", "code": 0}, limits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Discord gateway/REST stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--gateway-port", type=int, default=8765)
+    parser.add_argument("--api-port", type=int, default=8766)
+    parser.add_argument("--heartbeat-interval", type=int, default=41250)
+    parser.add_argument("--guilds", type=int, default=10)
+    parser.add_argument("--channels-per-guild", type=int, default=20)
+    parser.add_argument("--storm-rate", type=float, default=0, help="continuous MESSAGE_CREATE events per second")
+    parser.add_argument("--storm-size", type=int, default=200)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--rest-latency", type=float, default=0.0)
+    parser.add_argument("--rest-drop-rate", type=float, default=0.0)
+    parser.add_argument("--rest-429-every", type=int, default=0)
+    parser.add_argument("--no-ack", action="store_true", help="never ACK heartbeats")
+    args = parser.parse_args()
+    server = MockDiscord(
+        args.host, args.gateway_port, args.api_port,
+        heartbeat_interval=args.heartbeat_interval,
+        ack_heartbeats=not args.no_ack,
+        guilds=args.guilds,
+        channels_per_guild=args.channels_per_guild,
+        storm_rate=args.storm_rate,
+        storm_size=args.storm_size,
+        drop_rate=args.drop_rate,
+        rest_latency=args.rest_latency,
+        rest_drop_rate=args.rest_drop_rate,
+        rest_429_every=args.rest_429_every,
+    ).start()
+    print(f"DISCORD_GATEWAY_URL={server.gateway_url}")
+    print(f"DISCORD_API_URL={server.api_url}")
+    try:
+        while True:
+            time.sleep(5)
+            print(dict(server.stats))
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
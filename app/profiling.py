@@ -0,0 +1,218 @@
+import io
+import time
+import threading
+from pathlib import Path
+from .heartbeat import LatencyHistogram
+
+STAGES = ("recv", "decode", "dispatch", "encode", "send")
+# Extra seconds a capture may overrun before it is abandoned
+DEADLINE_GRACE = 5.0
+# Per-message stages run in microseconds, not the milliseconds of network latency
+STAGE_BUCKETS = (1e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1)
+
+
+class StageTimers:
+    """Histograms of time spent per gateway stage.
+
+    Callers check `enabled` themselves before reading the clock, so a
+    disabled instance costs one attribute lookup per stage.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.hist = {stage: LatencyHistogram(buckets=STAGE_BUCKETS) for stage in STAGES}
+
+    def observe(self, stage: str, seconds: float):
+        self.hist[stage].observe(seconds)
+
+    def reset(self):
+        self.hist = {stage: LatencyHistogram(buckets=STAGE_BUCKETS) for stage in STAGES}
+
+    def stats(self) -> dict:
+        def us(v):
+            return None if v is None else round(v * 1e6, 1)
+        result = {"enabled": self.enabled}
+        for stage, h in self.hist.items():
+            result[stage] = {
+                "count": h.count,
+                "total_ms": round(h.sum * 1000, 2),
+                "p50_us": us(h.percentile(50)),
+                "p99_us": us(h.percentile(99)),
+            }
+        return result
+
+
+class CpuCapture:
+    """cProfile for the gateway thread.
+
+    cProfile only sees the thread that enabled it, so this runs as the
+    bot's `gateway_hook`: the first message after `start` enables it on the
+    gateway thread and the first one past the deadline disables it and
+    writes the report. A timer abandons the capture if no message arrives
+    in time (idle session, wedged or reconnecting gateway thread).
+    """
+    kind = "cpu"
+
+    def __init__(self, bot, seconds: float, path: Path):
+        import cProfile
+        self.bot = bot
+        self.seconds = seconds
+        self.path = path
+        self.profile = cProfile.Profile()
+        self.started = None
+        self.enabled = False
+        self.deadline = None
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+        self._timer = None
+        self._stale = None
+
+    def start(self):
+        # A capture abandoned mid-run may still have its profiler enabled on the gateway thread
+        if isinstance(self.bot.gateway_hook, CpuCapture):
+            self._stale = self.bot.gateway_hook
+        self.deadline = time.monotonic() + self.seconds + DEADLINE_GRACE
+        self._timer = threading.Timer(self.seconds + DEADLINE_GRACE, self._expire)
+        self._timer.daemon = True
+        self._timer.start()
+        self.bot.gateway_hook = self
+
+    def __call__(self):
+        if self.done.is_set():
+            # Abandoned while the gateway thread was stalled; stop profiling it from here
+            self._disable()
+            if self.bot.gateway_hook is self:
+                self.bot.gateway_hook = None
+            return
+        now = time.monotonic()
+        if self.started is None:
+            if self._stale is not None:
+                self._stale._disable()
+                self._stale = None
+            self.started = now
+            self.enabled = True
+            self.profile.enable()
+        elif now - self.started >= self.seconds:
+            with self._lock:
+                if self.done.is_set():
+                    return
+                self._disable()
+                if self.bot.gateway_hook is self:
+                    self.bot.gateway_hook = None
+                self._timer.cancel()
+                self._write(now - self.started)
+
+    def _disable(self):
+        # Only valid on the gateway thread, the one that enabled it
+        if self.enabled:
+            self.enabled = False
+            self.profile.disable()
+
+    def _expire(self):
+        with self._lock:
+            if self.done.is_set():
+                return
+            # The profiler can only be disabled from the gateway thread, so the
+            # hook stays installed while it is on and `__call__` cleans up there
+            if not self.enabled and self.bot.gateway_hook is self:
+                self.bot.gateway_hook = None
+            if self.started is None:
+                reason = "no gateway message arrived"
+            else:
+                reason = "the gateway thread stalled before the capture could finish"
+            try:
+                self.path.write_text(
+                    f"cProfile capture abandoned after {self.seconds + DEADLINE_GRACE:.1f}s: {reason}\n",
+                    encoding="utf-8",
+                )
+            except OSError as e:
+                print(f"Could not write profile {self.path}: {e}")
+            finally:
+                self.done.set()
+
+    def _write(self, elapsed: float):
+        import pstats
+        try:
+            self.profile.dump_stats(self.path.with_suffix(".prof"))
+            out = io.StringIO()
+            out.write(f"cProfile of the gateway thread for {elapsed:.1f}s\n\n")
+            stats = pstats.Stats(self.profile, stream=out).strip_dirs()
+            stats.sort_stats("tottime").print_stats(30)
+            stats.sort_stats("cumulative").print_stats(30)
+            self.path.write_text(out.getvalue(), encoding="utf-8")
+        except OSError as e:
+            print(f"Could not write profile {self.path}: {e}")
+        finally:
+            self.done.set()
+
+
+class MemoryCapture:
+    """tracemalloc for `seconds`, reporting what grew between the first and last snapshot"""
+    kind = "memory"
+
+    def __init__(self, bot, seconds: float, path: Path, frames: int = 10):
+        self.bot = bot
+        self.seconds = seconds
+        self.path = path
+        self.frames = frames
+        self.deadline = None
+        self.done = threading.Event()
+
+    def start(self):
+        self.deadline = time.monotonic() + self.seconds + DEADLINE_GRACE
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        import tracemalloc
+        owned = not tracemalloc.is_tracing()
+        if owned:
+            tracemalloc.start(self.frames)
+        try:
+            before = tracemalloc.take_snapshot()
+            time.sleep(self.seconds)
+            after = tracemalloc.take_snapshot()
+        finally:
+            if owned:
+                tracemalloc.stop()
+        # The tracer's own bookkeeping is not what we are looking for
+        ignore = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap>"))
+        before, after = before.filter_traces(ignore), after.filter_traces(ignore)
+        out = io.StringIO()
+        out.write(f"tracemalloc growth over {self.seconds:.1f}s\n\nTop lines:\n")
+        for stat in after.compare_to(before, "lineno")[:30]:
+            out.write(f"{stat}\n")
+        out.write("\nTop tracebacks:\n")
+        for stat in after.compare_to(before, "traceback")[:5]:
+            out.write(f"\n{stat.size_diff / 1024:+.1f} KiB, {stat.count_diff:+d} blocks\n")
+            out.write("\n".join(stat.traceback.format()) + "\n")
+        try:
+            self.path.write_text(out.getvalue(), encoding="utf-8")
+        except OSError as e:
+            print(f"Could not write memory profile {self.path}: {e}")
+        finally:
+            self.done.set()
+
+
+CAPTURES = {"cpu": CpuCapture, "memory": MemoryCapture}
+
+
+def start_capture(bot, kind: str, seconds: float, directory: Path):
+    """Start a capture and return it; its report lands in `directory` when it finishes"""
+    if kind not in CAPTURES:
+        raise ValueError(f"unknown profile kind {kind!r}, expected one of {', '.join(CAPTURES)}")
+    if not 0 < seconds <= 600:
+        raise ValueError("seconds must be between 0 and 600")
+    directory.mkdir(parents=True, exist_ok=True)
+    stem = f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}"
+    n = 0
+    while True:
+        path = directory / (f"{stem}-{n}.txt" if n else f"{stem}.txt")
+        try:
+            # Claim the name now so a second capture in the same second gets its own
+            path.open("x").close()
+            break
+        except FileExistsError:
+            n += 1
+    capture = CAPTURES[kind](bot, seconds, path)
+    capture.start()
+    return capture
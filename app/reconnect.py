@@ -0,0 +1,120 @@
+import time
+import random
+import threading
+from .heartbeat import LatencyHistogram
+
+# Gateway close codes, see https://discord.com/developers/docs/topics/opcodes-and-status-codes
+CLOSE_AUTHENTICATION_FAILED = 4004
+# The gateway invalidates a session closed with 1000/1001; any other code keeps it resumable
+CLOSE_NORMAL = 1000
+CLOSE_RESUMABLE = 4000
+# Resuming is pointless, the session is gone
+REIDENTIFY_CLOSE_CODES = {4007, 4009}
+# Configuration errors that a retry cannot fix
+FATAL_CLOSE_CODES = {4010, 4011, 4012, 4013, 4014}
+CLOSE_REASONS = {
+    4004: "authentication failed",
+    4010: "invalid shard",
+    4011: "sharding required",
+    4012: "invalid API version",
+    4013: "invalid intents",
+    4014: "disallowed intents",
+}
+
+
+class ReconnectPolicy:
+    """Decides how long to wait before the next gateway connection.
+
+    Server-requested reconnects, resumable closes and zombie drops go
+    straight back; connect failures use decorrelated-jitter backoff.
+    The backoff resets once a session has stayed up for `stable_after`
+    seconds, and a run of fast reconnects that never reach READY/RESUMED
+    falls back to backoff too.
+    """
+
+    def __init__(self, base: float = 1.0, cap: float = 30.0, stable_after: float = 60.0,
+                 fast_attempts: int = 3, auth_failure_limit: int = 2):
+        self.base = base
+        self.cap = cap
+        self.stable_after = stable_after
+        self.fast_attempts = fast_attempts
+        self.auth_failure_limit = auth_failure_limit
+        self._wake = threading.Event()
+        self._backoff = base
+        self.attempts = 0
+        self.auth_failures = 0
+        self.fatal = None
+        self.connected_at = None
+        self.down_since = None
+        self.time_to_reconnect = LatencyHistogram()
+
+    def connected(self):
+        """READY or RESUMED arrived"""
+        now = time.monotonic()
+        if self.down_since is not None:
+            self.time_to_reconnect.observe(now - self.down_since)
+            self.down_since = None
+        self.connected_at = now
+        self.attempts = 0
+        self.auth_failures = 0
+
+    def next_delay(self, reason: str, close_code: int | None = None) -> float | None:
+        """Seconds to wait before reconnecting, or None to give up.
+
+        `reason` is "reconnect" (op 7 / resumable op 9), "reidentify"
+        (non-resumable op 9), "zombie", "closed" (with the close code, if any)
+        or "error".
+        """
+        now = time.monotonic()
+        if self.down_since is None:
+            self.down_since = now
+        if self.connected_at is not None:
+            if now - self.connected_at >= self.stable_after:
+                self._backoff = self.base
+            self.connected_at = None
+        self.attempts += 1
+
+        if close_code in FATAL_CLOSE_CODES:
+            self.fatal = f"{close_code} {CLOSE_REASONS[close_code]}"
+            return None
+        if close_code == CLOSE_AUTHENTICATION_FAILED:
+            self.auth_failures += 1
+            if self.auth_failures >= self.auth_failure_limit:
+                # Circuit open: the token is bad, hammering IDENTIFY only risks a ban
+                self.fatal = f"{close_code} {CLOSE_REASONS[close_code]} ({self.auth_failures} times)"
+                return None
+            return self._jitter()
+        if reason == "reidentify" or close_code in REIDENTIFY_CLOSE_CODES:
+            # The gateway asks for a 1-5s wait before the next IDENTIFY
+            return random.uniform(1, 5)
+        if reason == "error" or self.attempts > self.fast_attempts:
+            return self._jitter()
+        return 0.0
+
+    @staticmethod
+    def needs_identify(close_code: int | None) -> bool:
+        return close_code in REIDENTIFY_CLOSE_CODES
+
+    def _jitter(self) -> float:
+        # Decorrelated jitter: spread retries out without synchronising clients
+        self._backoff = min(self.cap, random.uniform(self.base, self._backoff * 3))
+        return self._backoff
+
+    def sleep(self, seconds: float) -> bool:
+        """Wait before reconnecting; returns False if `interrupt()` cut it short"""
+        return not self._wake.wait(seconds)
+
+    def interrupt(self):
+        self._wake.set()
+
+    def stats(self) -> dict:
+        p50 = self.time_to_reconnect.percentile(50)
+        p99 = self.time_to_reconnect.percentile(99)
+        return {
+            "attempts": self.attempts,
+            "backoff_s": round(self._backoff, 2),
+            "auth_failures": self.auth_failures,
+            "fatal": self.fatal,
+            "reconnect_p50_s": None if p50 is None else round(p50, 3),
+            "reconnect_p99_s": None if p99 is None else round(p99, 3),
+        }
@@ -0,0 +1,287 @@
+"""Gateway traffic recorder and replay.
+
+    python -m app.recorder replay gateway.rec [--paced] [--speed 2] [--handle MESSAGE_CREATE]
+
+A recording is a gzip stream of records: a 13-byte header (kind, monotonic
+nanoseconds since the recording started, payload length) then the payload.
+Inbound messages are stored after zlib-stream inflation, so every rotated
+file replays on its own. Each file starts with a META record (JSON) naming
+the encoding.
+"""
+import os
+import gzip
+import json
+import time
+import queue
+import struct
+import argparse
+import tempfile
+import threading
+import zlib
+from pathlib import Path
+
+RECORD = struct.Struct("<BQI")
+KIND_META = 0
+KIND_IN_TEXT = 1
+KIND_IN_BINARY = 2
+KIND_OUT_TEXT = 3
+KIND_OUT_BINARY = 4
+KIND_OPEN = 5
+KIND_CLOSE = 6
+KIND_NAMES = {
+    KIND_META: "meta", KIND_IN_TEXT: "in", KIND_IN_BINARY: "in", KIND_OUT_TEXT: "out",
+    KIND_OUT_BINARY: "out", KIND_OPEN: "open", KIND_CLOSE: "close",
+}
+# Records buffered for the writer thread before new ones are dropped
+MAX_BACKLOG = 50000
+FLUSH_INTERVAL = 1.0
+
+
+class TrafficRecorder:
+    """Writes gateway frames to `path` from a background thread.
+
+    `inbound()`/`outbound()` only stamp the time and queue the frame, so the
+    gateway thread never waits on compression or the disk. The file is
+    rotated to `path.1`, `path.2`, ... once it reaches `max_bytes`, keeping
+    `max_files` in total.
+    """
+
+    def __init__(self, path: Path, encoding: str = "json", max_bytes: int = 64 * 1048576, max_files: int = 4):
+        self.path = Path(path)
+        self.encoding = encoding
+        self.max_bytes = max_bytes
+        self.max_files = max(1, max_files)
+        self.records = 0
+        self.dropped = 0
+        self.rotations = 0
+        self._t0 = time.monotonic_ns()
+        self._queue = queue.SimpleQueue()
+        self._raw = None
+        self._gz = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _put(self, kind: int, data: bytes):
+        if self._queue.qsize() >= MAX_BACKLOG:
+            self.dropped += 1
+            return
+        self._queue.put((kind, time.monotonic_ns() - self._t0, data))
+
+    def inbound(self, msg):
+        if isinstance(msg, str):
+            self._put(KIND_IN_TEXT, msg.encode("utf-8"))
+        else:
+            self._put(KIND_IN_BINARY, bytes(msg))
+
+    def outbound(self, data, op: int | None = None):
+        if op in (2, 6):
+            # IDENTIFY and RESUME carry the token, keep only the fact they were sent
+            self._put(KIND_OUT_TEXT, json.dumps({"op": op, "d": "<redacted>"}).encode("utf-8"))
+        elif isinstance(data, str):
+            self._put(KIND_OUT_TEXT, data.encode("utf-8"))
+        else:
+            self._put(KIND_OUT_BINARY, bytes(data))
+
+    def opened(self, url: str):
+        self._put(KIND_OPEN, url.encode("utf-8"))
+
+    def closed(self, code: int | None):
+        self._put(KIND_CLOSE, b"" if code is None else str(code).encode("ascii"))
+
+    def close(self, timeout: float = 5.0):
+        """Write out everything queued and close the file"""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "path": str(self.path),
+            "records": self.records,
+            "dropped": self.dropped,
+            "rotations": self.rotations,
+            "backlog": self._queue.qsize(),
+        }
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists() and self.path.stat().st_size:
+            # Timestamps restart with every recorder, so a previous recording is rotated away, never appended to
+            self._rotate()
+        self._raw = open(self.path, "wb")
+        self._gz = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=5)
+        meta = json.dumps({"version": 1, "encoding": self.encoding, "started": time.time()}).encode("utf-8")
+        self._write(KIND_META, time.monotonic_ns() - self._t0, meta)
+
+    def _write(self, kind: int, t: int, data: bytes):
+        self._gz.write(RECORD.pack(kind, t, len(data)))
+        self._gz.write(data)
+
+    def _close_file(self):
+        if self._gz is not None:
+            self._gz.close()
+            self._raw.close()
+            self._gz = self._raw = None
+
+    def _rotate(self):
+        self._close_file()
+        for i in range(self.max_files - 1, 0, -1):
+            src = self.path if i == 1 else self.path.with_name(f"{self.path.name}.{i - 1}")
+            if src.exists():
+                os.replace(src, self.path.with_name(f"{self.path.name}.{i}"))
+        if self.max_files == 1:
+            self.path.unlink(missing_ok=True)
+        self.rotations += 1
+
+    def _run(self):
+        last_flush = time.monotonic()
+        try:
+            self._open()
+            while True:
+                try:
+                    item = self._queue.get(timeout=FLUSH_INTERVAL)
+                except queue.Empty:
+                    item = ()
+                if item is None:
+                    break
+                if item:
+                    self._write(*item)
+                    self.records += 1
+                now = time.monotonic()
+                if now - last_flush >= FLUSH_INTERVAL:
+                    # A crash loses at most the last second
+                    self._gz.flush()
+                    last_flush = now
+                    if self._raw.tell() >= self.max_bytes:
+                        self._rotate()
+                        self._open()
+        except OSError as e:
+            print(f"Traffic recorder stopped: {e}")
+        finally:
+            try:
+                self._close_file()
+            except OSError:
+                pass
+
+
+def recording_files(path: Path) -> list:
+    """`path` and its rotated siblings, oldest first"""
+    path = Path(path)
+    rotated = sorted(
+        (p for p in path.parent.glob(path.name + ".*") if p.name.rsplit(".", 1)[1].isdigit()),
+        key=lambda p: int(p.name.rsplit(".", 1)[1]),
+        reverse=True,
+    )
+    return rotated + ([path] if path.exists() else [])
+
+
+def read_records(path: Path):
+    """Yield (kind, seconds, data) from a recording and its rotations; a torn tail ends a file quietly"""
+    for file in recording_files(path):
+        with gzip.open(file, "rb") as f:
+            while True:
+                try:
+                    header = f.read(RECORD.size)
+                    if len(header) < RECORD.size:
+                        break
+                    kind, t, size = RECORD.unpack(header)
+                    data = f.read(size)
+                except (EOFError, OSError, zlib.error):
+                    break
+                if len(data) < size:
+                    break
+                yield kind, t / 1e9, data
+
+
+class ReplayEngine:
+    """Feeds a recording through `bot._process_message`, with no network.
+
+    Outbound records are counted, not sent. With `paced`, messages are
+    delivered at their recorded offsets divided by `speed`.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    def run(self, path: Path, paced: bool = False, speed: float = 1.0) -> dict:
+        from .codec import get_codec
+        bot = self.bot
+        counts = {"messages": 0, "bytes": 0, "outbound": 0, "connections": 0, "actions": 0}
+        started = None
+        # Pacing origin: the first record of the current file and when it was delivered
+        start = None
+        first_t = None
+        handle_seconds = 0.0
+        for kind, t, data in read_records(path):
+            if kind == KIND_META:
+                meta = json.loads(data)
+                if meta.get("encoding") and meta["encoding"] != bot.codec.encoding:
+                    bot.codec = get_codec(meta["encoding"])
+                # Each file may come from a different recorder with its own clock
+                first_t = None
+                continue
+            if first_t is None:
+                first_t = t
+                start = time.perf_counter()
+                if started is None:
+                    started = start
+            if paced:
+                wait = (t - first_t) / speed - (time.perf_counter() - start)
+                if wait > 0:
+                    time.sleep(wait)
+            if kind in (KIND_IN_TEXT, KIND_IN_BINARY):
+                msg = data.decode("utf-8") if kind == KIND_IN_TEXT else data
+                t0 = time.perf_counter()
+                if bot._process_message(msg, len(data)):
+                    counts["actions"] += 1
+                handle_seconds += time.perf_counter() - t0
+                counts["messages"] += 1
+                counts["bytes"] += len(data)
+            elif kind in (KIND_OUT_TEXT, KIND_OUT_BINARY):
+                counts["outbound"] += 1
+            elif kind == KIND_OPEN:
+                counts["connections"] += 1
+        elapsed = time.perf_counter() - started if started is not None else 0.0
+        return {
+            **counts,
+            "seconds": round(elapsed, 4),
+            "handle_seconds": round(handle_seconds, 4),
+            "messages_per_sec": round(counts["messages"] / handle_seconds, 1) if handle_seconds else None,
+        }
+
+
+def replay_file(path: Path, paced: bool = False, speed: float = 1.0, handle=(), config: dict | None = None) -> dict:
+    """Replay into a fresh, unconnected `DiscordBot`; `handle` registers no-op consumers so those events are decoded"""
+    from .core import DiscordBot
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = Path(tmp) / "config.json"
+        config_path.write_text(json.dumps({"identity_cache_ttl": 0, **(config or {})}), encoding="utf-8")
+        bot = DiscordBot("replay", config_path)
+        for t in handle:
+            bot.register_dispatch(t, lambda d: None)
+        try:
+            return {**ReplayEngine(bot).run(path, paced, speed), "sequence": bot.sequence}
+        finally:
+            bot.sender.stop()
+            bot.config.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gateway traffic recordings")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rp = sub.add_parser("replay", help="feed a recording through decode/dispatch")
+    rp.add_argument("path")
+    rp.add_argument("--paced", action="store_true", help="keep the recorded timing instead of going flat out")
+    rp.add_argument("--speed", type=float, default=1.0, help="pacing multiplier")
+    rp.add_argument("--handle", action="append", default=[], help="dispatch type to fully decode (repeatable)")
+    ls = sub.add_parser("dump", help="list records")
+    ls.add_argument("path")
+    args = parser.parse_args()
+    if args.command == "replay":
+        print(json.dumps(replay_file(Path(args.path), args.paced, args.speed, args.handle), indent=2))
+    else:
+        for kind, t, data in read_records(Path(args.path)):
+            print(f"{t:12.6f} {KIND_NAMES.get(kind, kind):<5} {len(data):>8} {data[:80]!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import os
+import time
+import threading
+from .heartbeat import LatencyHistogram
+
+API = "https://discord.com/api/v9"
+
+
+class RateLimitBucket:
+    __slots__ = ("remaining", "reset_at", "lock")
+
+    def __init__(self):
+        self.remaining = None
+        self.reset_at = 0.0
+        # Requests on one bucket queue here while it is exhausted
+        self.lock = threading.Lock()
+
+    def delay(self, now: float) -> float:
+        if self.remaining is not None and self.remaining <= 0 and now < self.reset_at:
+            return self.reset_at - now
+        return 0.0
+
+
+class RestClient:
+    """Keep-alive REST client that honours Discord's per-bucket rate limits"""
+
+    def __init__(self, base: str = API, timeout: float = 10, pool_size: int = 4, max_retries: int = 3):
+        self.base = base.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.pool_size = pool_size
+        self._session = None
+        self._lock = threading.Lock()
+        self._route_bucket = {}
+        self._buckets = {}
+        self._global_reset = 0.0
+        self.latency = {}
+        self.ratelimited = 0
+
+    @property
+    def session(self):
+        """The pooled `requests.Session`, created (and `requests` imported) on first use"""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    session.headers["Content-Type"] = "application/json"
+                    self._session = session
+        return self._session
+
+    def _bucket_for(self, route: str) -> RateLimitBucket:
+        with self._lock:
+            # Routes share a bucket once the server told us its hash
+            key = self._route_bucket.get(route, route)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = RateLimitBucket()
+            return bucket
+
+    def _update_bucket(self, route: str, bucket: RateLimitBucket, resp) -> RateLimitBucket:
+        h = resp.headers
+        bucket_hash = h.get("X-RateLimit-Bucket")
+        if bucket_hash:
+            with self._lock:
+                if self._route_bucket.get(route) != bucket_hash:
+                    self._route_bucket[route] = bucket_hash
+                    bucket = self._buckets.setdefault(bucket_hash, bucket)
+        remaining = h.get("X-RateLimit-Remaining")
+        reset_after = h.get("X-RateLimit-Reset-After")
+        if remaining is not None:
+            bucket.remaining = int(remaining)
+        if reset_after is not None:
+            bucket.reset_at = time.monotonic() + float(reset_after)
+        return bucket
+
+    def _observe(self, route: str, seconds: float):
+        hist = self.latency.get(route)
+        if hist is None:
+            hist = self.latency[route] = LatencyHistogram()
+        hist.observe(seconds)
+
+    def request(self, method: str, path: str, route: str | None = None, **kwargs):
+        """Send a request, waiting out known limits first and retrying 429s.
+
+        `route` groups paths for rate limiting and latency stats, e.g.
+        "GET /channels/{id}"; it defaults to the method and path.
+        """
+        route = route or f"{method} {path}"
+        kwargs.setdefault("timeout", self.timeout)
+        url = self.base + path
+        bucket = self._bucket_for(route)
+        resp = None
+        for _ in range(self.max_retries):
+            with bucket.lock:
+                now = time.monotonic()
+                wait = max(bucket.delay(now), self._global_reset - now)
+                if wait > 0:
+                    time.sleep(wait)
+                t0 = time.perf_counter()
+                resp = self.session.request(method, url, **kwargs)
+                self._observe(route, time.perf_counter() - t0)
+                bucket = self._update_bucket(route, bucket, resp)
+            if resp.status_code != 429:
+                return resp
+            self.ratelimited += 1
+            try:
+                body = resp.json()
+            except ValueError:
+                body = {}
+            retry_after = float(body.get("retry_after") or resp.headers.get("Retry-After") or 1)
+            if body.get("global") or resp.headers.get("X-RateLimit-Global"):
+                self._global_reset = time.monotonic() + retry_after
+            else:
+                bucket.remaining = 0
+                bucket.reset_at = time.monotonic() + retry_after
+        return resp
+
+    def get(self, path: str, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def stats(self) -> dict:
+        routes = {}
+        for route, hist in list(self.latency.items()):
+            routes[route] = {
+                "count": hist.count,
+                "p50_ms": round(hist.percentile(50) * 1000, 1),
+                "p99_ms": round(hist.percentile(99) * 1000, 1),
+            }
+        return {"ratelimited": self.ratelimited, "routes": routes}
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def default_api() -> str:
+    """REST base URL, `DISCORD_API_URL` points it at a local stand-in server"""
+    return os.getenv("DISCORD_API_URL") or API
+
+
+def get_client(base: str | None = None) -> RestClient:
+    """Process-wide client per base URL, so every caller shares one connection pool"""
+    base = base or default_api()
+    with _clients_lock:
+        client = _clients.get(base)
+        if client is None:
+            client = _clients[base] = RestClient(base)
+        return client
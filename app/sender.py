@@ -0,0 +1,223 @@
+import time
+import threading
+from collections import deque, OrderedDict
+from .heartbeat import LatencyHistogram
+
+# Gateway limit: 120 payloads per connection per 60 seconds
+SEND_LIMIT = 120
+SEND_WINDOW = 60.0
+# Tokens only heartbeats may spend, so user traffic can never starve them
+HEARTBEAT_RESERVE = 4
+
+
+class TokenBucket:
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, capacity: int = SEND_LIMIT, window: float = SEND_WINDOW):
+        self.capacity = capacity
+        self.rate = capacity / window
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, floor: float) -> float:
+        """Seconds until a token above `floor` is available"""
+        if self.tokens - floor >= 1:
+            return 0.0
+        return (floor + 1 - self.tokens) / self.rate
+
+
+class SendScheduler:
+    """Single writer for every outbound gateway payload.
+
+    Heartbeats go first and may use the reserve; IDENTIFY/RESUME come next
+    and are dropped if their connection is gone. Other payloads wait for an
+    authenticated session. Pending op 3 collapses to the newest presence and
+    op 4 to the newest state per guild.
+    """
+
+    def __init__(self, bot, limit: int = SEND_LIMIT, window: float = SEND_WINDOW, reserve: int = HEARTBEAT_RESERVE):
+        self.bot = bot
+        self.limit = limit
+        self.window = window
+        self.reserve = reserve
+        self.bucket = TokenBucket(limit, window)
+        self._cond = threading.Condition()
+        self._heartbeat = None
+        self._control = deque()
+        self._other = deque()
+        self._presence = None
+        self._voice = OrderedDict()
+        self._running = False
+        self._stopped = False
+        self._thread = None
+        self.wait = LatencyHistogram()
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.throttled_seconds = 0.0
+
+    def depth(self) -> int:
+        return (
+            (self._heartbeat is not None)
+            + len(self._control)
+            + len(self._other)
+            + (self._presence is not None)
+            + len(self._voice)
+        )
+
+    def send(self, payload: dict) -> bool:
+        """Queue `payload` for the writer; returns False once stopped"""
+        op = payload.get("op")
+        item = (time.monotonic(), self.bot.ws, payload)
+        with self._cond:
+            if self._stopped:
+                return False
+            if op == 1:
+                # The writer fills in the sequence current at send time
+                self.coalesced += self._heartbeat is not None
+                self._heartbeat = item
+            elif op in (2, 6):
+                self._control.append(item)
+            elif op == 3:
+                self.coalesced += self._presence is not None
+                self._presence = item
+            elif op == 4:
+                key = str(payload["d"].get("guild_id"))
+                if key in self._voice:
+                    self.coalesced += 1
+                    # Keep the original place in line, only the state is replaced
+                    self._voice[key] = (self._voice[key][0], item[1], payload)
+                else:
+                    self._voice[key] = item
+            else:
+                self._other.append(item)
+            self._ensure_running()
+            self._cond.notify_all()
+        return True
+
+    def connection_opened(self):
+        """Each gateway connection starts with a full send budget"""
+        with self._cond:
+            self.bucket = TokenBucket(self.limit, self.window)
+            self._cond.notify_all()
+
+    def wake(self):
+        """Re-check gated payloads, e.g. once the session is READY"""
+        with self._cond:
+            self._cond.notify_all()
+
+    def flush(self, timeout: float) -> bool:
+        """Wait until everything queued has been written (or dropped)"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self.depth() or not self._running, timeout)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._running = False
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        def ms(v):
+            return None if v is None else round(v * 1000, 2)
+        return {
+            "depth": self.depth(),
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "throttled_s": round(self.throttled_seconds, 3),
+            "tokens": round(self.bucket.tokens, 1),
+            "wait_p50_ms": ms(self.wait.percentile(50)),
+            "wait_p99_ms": ms(self.wait.percentile(99)),
+            "wait_max_ms": ms(max(self.wait.samples) if self.wait.samples else None),
+        }
+
+    def _ensure_running(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._running = True
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _next(self, ready: bool):
+        """Pop the highest-priority sendable item, with the token floor it may spend down to"""
+        if self._heartbeat is not None:
+            item, self._heartbeat = self._heartbeat, None
+            return item, 0
+        if self._control:
+            return self._control.popleft(), self.reserve
+        if not ready:
+            return None, 0
+        if self._other:
+            return self._other.popleft(), self.reserve
+        if self._voice:
+            return self._voice.popitem(last=False)[1], self.reserve
+        if self._presence is not None:
+            item, self._presence = self._presence, None
+            return item, self.reserve
+        return None, 0
+
+    def _peek_floor(self, ready: bool) -> int | None:
+        if self._heartbeat is not None:
+            return 0
+        if self._control or (ready and (self._other or self._voice or self._presence is not None)):
+            return self.reserve
+        return None
+
+    def _run(self):
+        bot = self.bot
+        while True:
+            with self._cond:
+                while True:
+                    if not self._running:
+                        return
+                    ws = bot.ws
+                    connected = ws is not None and ws.connected
+                    ready = connected and bot.session_connected
+                    floor = self._peek_floor(ready) if connected else None
+                    if floor is None:
+                        # Gated payloads are re-checked on wake() and at least once a second
+                        self._cond.wait(1.0 if self.depth() else None)
+                        continue
+                    now = time.monotonic()
+                    self.bucket.refill(now)
+                    delay = self.bucket.wait_for(floor)
+                    if delay > 0:
+                        self.throttled_seconds += delay
+                        self._cond.wait(delay)
+                        continue
+                    (queued_at, item_ws, payload), _ = self._next(ready)
+                    self.bucket.tokens -= 1
+                    break
+            op = payload.get("op")
+            if op in (1, 2, 6) and item_ws is not ws:
+                # Meant for a connection that has since been replaced
+                self.dropped += 1
+                with self._cond:
+                    self._cond.notify_all()
+                continue
+            try:
+                if op == 1:
+                    payload = {"op": 1, "d": bot.sequence}
+                    bot.heartbeat.sent()
+                if bot.stages.enabled:
+                    t0 = time.perf_counter()
+                    data = bot.codec.encode(payload)
+                    t1 = time.perf_counter()
+                    ws.send(data, opcode=bot.codec.opcode)
+                    bot.stages.observe("encode", t1 - t0)
+                    bot.stages.observe("send", time.perf_counter() - t1)
+                else:
+                    data = bot.codec.encode(payload)
+                    ws.send(data, opcode=bot.codec.opcode)
+                if bot.recorder is not None:
+                    bot.recorder.outbound(data, op)
+                self.sent += 1
+                self.wait.observe(time.monotonic() - queued_at)
+            except Exception:
+                self.dropped += 1
+            with self._cond:
+                self._cond.notify_all()
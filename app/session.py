@@ -0,0 +1,89 @@
+import sys
+
+
+class SessionInfo:
+    __slots__ = ("session_id", "resume_gateway_url")
+
+    def __init__(self, session_id: str | None, resume_gateway_url: str | None):
+        self.session_id = session_id
+        self.resume_gateway_url = resume_gateway_url
+
+
+class UserRecord:
+    __slots__ = ("id", "username", "discriminator")
+
+    def __init__(self, id: str, username: str, discriminator: str):
+        self.id = id
+        self.username = username
+        self.discriminator = discriminator
+
+    @classmethod
+    def from_payload(cls, user: dict) -> "UserRecord":
+        return cls(str(user.get("id", "")), user.get("username", ""), user.get("discriminator", ""))
+
+
+class VoiceStateRecord:
+    __slots__ = ("guild_id", "channel_id", "self_mute", "self_deaf")
+
+    def __init__(self, guild_id: str | None, channel_id: str | None, self_mute=False, self_deaf=False):
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.self_mute = self_mute
+        self.self_deaf = self_deaf
+
+    @classmethod
+    def from_payload(cls, vs: dict, guild_id=None) -> "VoiceStateRecord":
+        guild_id = vs.get("guild_id", guild_id)
+        channel_id = vs.get("channel_id")
+        return cls(
+            None if guild_id is None else str(guild_id),
+            None if channel_id is None else str(channel_id),
+            bool(vs.get("self_mute")),
+            bool(vs.get("self_deaf")),
+        )
+
+
+class ReadyDigest:
+    """Everything the process keeps from READY; the payload itself can be dropped"""
+    __slots__ = ("session", "user", "voice")
+
+    def __init__(self, session: SessionInfo, user: UserRecord | None, voice: VoiceStateRecord | None):
+        self.session = session
+        self.user = user
+        self.voice = voice
+
+
+def digest_ready(d: dict, channels) -> ReadyDigest:
+    """Pull the session, user, channel index and own voice state out of a READY payload"""
+    user = UserRecord.from_payload(d["user"]) if d.get("user") else None
+    voice = None
+    for guild in d.get("guilds") or ():
+        channels.add_guild(guild)
+        if user is None or voice is not None:
+            continue
+        for vs in guild.get("voice_states") or ():
+            if str(vs.get("user_id")) == user.id:
+                voice = VoiceStateRecord.from_payload(vs, guild.get("id"))
+                break
+    session = SessionInfo(d.get("session_id"), d.get("resume_gateway_url"))
+    return ReadyDigest(session, user, voice)
+
+
+def deep_sizeof(obj, seen: set | None = None) -> int:
+    """Approximate retained size of `obj`, counting shared objects once"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            size += deep_sizeof(k, seen) + deep_sizeof(v, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += deep_sizeof(item, seen)
+    elif hasattr(obj, "__slots__"):
+        for name in obj.__slots__:
+            size += deep_sizeof(getattr(obj, name, None), seen)
+    return size
@@ -0,0 +1,98 @@
+import threading
+
+
+class StateStore:
+    """Versioned key/value state shared between the gateway, UI and control threads.
+
+    Every change bumps a global version and the key's own version, then
+    notifies subscribers of that key (and of every key) on the writing
+    thread, so callbacks must be quick: set a flag, wake a loop.
+    """
+
+    def __init__(self, **initial):
+        self._cond = threading.Condition(threading.Lock())
+        self._values = dict(initial)
+        self._versions = dict.fromkeys(initial, 0)
+        self._listeners = {}
+        self.version = 0
+
+    def get(self, key, default=None):
+        return self._values.get(key, default)
+
+    def set(self, key, value) -> bool:
+        """Store `value`, returns False (and notifies no one) if it is unchanged"""
+        return bool(self.update({key: value}))
+
+    def update(self, values: dict) -> dict:
+        with self._cond:
+            changed = {k: v for k, v in values.items() if k not in self._values or self._values[k] != v}
+            if not changed:
+                return changed
+            self.version += 1
+            for key, value in changed.items():
+                self._values[key] = value
+                self._versions[key] = self.version
+            version = self.version
+            self._cond.notify_all()
+            listeners = [(key, list(self._listeners.get(key, ()))) for key in changed]
+            wildcard = list(self._listeners.get(None, ()))
+        for key, callbacks in listeners:
+            for callback in callbacks:
+                self._call(callback, key, changed[key], version)
+        for callback in wildcard:
+            for key, value in changed.items():
+                self._call(callback, key, value, version)
+        return changed
+
+    @staticmethod
+    def _call(callback, key, value, version):
+        try:
+            callback(key, value, version)
+        except Exception as e:
+            print(f"State listener error for {key}: {e}")
+
+    def subscribe(self, key, callback):
+        """Call `callback(key, value, version)` on changes to `key`, or to any key if None.
+
+        Returns a function that unsubscribes.
+        """
+        with self._cond:
+            self._listeners.setdefault(key, []).append(callback)
+
+        def unsubscribe():
+            with self._cond:
+                callbacks = self._listeners.get(key, [])
+                if callback in callbacks:
+                    callbacks.remove(callback)
+        return unsubscribe
+
+    def snapshot(self) -> tuple:
+        """(version, copy of every value) taken atomically"""
+        with self._cond:
+            return self.version, dict(self._values)
+
+    def changes_since(self, version: int) -> tuple:
+        """(current version, values of the keys changed after `version`)"""
+        with self._cond:
+            return self.version, {k: self._values[k] for k, v in self._versions.items() if v > version}
+
+    def wait(self, version: int, timeout: float | None = None) -> int:
+        """Block until the store moves past `version` or the timeout; returns the current version"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version > version, timeout)
+            return self.version
+
+
+class StateField:
+    """Attribute that lives in the owner's `state` store, so plain assignments notify"""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return obj.state.get(self.name)
+
+    def __set__(self, obj, value):
+        obj.state.set(self.name, value)
@@ -0,0 +1,259 @@
+"""Supervisor mode: the gateway session runs in a worker process that is restarted when it misbehaves.
+
+The worker is the headless daemon (control socket included) plus a report
+sent over a pipe every second: time since the last received frame and the
+last heartbeat ACK, RSS, CPU and the session to resume. The supervisor
+restarts it when it exits, stops reporting, stops receiving, or stays over
+the configured memory or CPU limits, and the new worker RESUMEs the same
+session.
+"""
+import os
+import sys
+import time
+import signal
+import threading
+import multiprocessing
+from collections import Counter
+from pathlib import Path
+from .config import ConfigStore
+
+REPORT_INTERVAL = 1.0
+# Worker exit status meaning a restart cannot help (bad token, fatal close code)
+EXIT_FATAL = 3
+# Workers replaced sooner than this after starting are restarted with backoff
+CRASH_WINDOW = 300.0
+SESSION_KEYS = ("session_id", "sequence", "resume_gateway_url")
+
+
+def worker_main(token: str, config_path: Path, socket_path: Path | None, resume: dict | None, conn) -> int:
+    from .core import DiscordBot, AuthenticationError
+    from .control import ControlServer, default_socket_path
+    stopped = threading.Event()
+    # Ctrl+C reaches the whole process group; the supervisor decides what happens
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopped.set())
+    bot = DiscordBot(token, config_path)
+    if resume and resume.get("session_id"):
+        bot.restore_session(**{k: resume.get(k) for k in SESSION_KEYS})
+    server = ControlServer(bot, socket_path or default_socket_path(config_path), on_stop=stopped.set)
+    try:
+        server.start()
+    except (OSError, RuntimeError) as e:
+        print(f"Control socket unavailable: {e}")
+        return 1
+    try:
+        bot.login()
+    except AuthenticationError as e:
+        # The API answered and refused the token
+        server.stop()
+        print(f"Login failed: {e}")
+        return EXIT_FATAL
+    except Exception as e:
+        server.stop()
+        print(f"Login failed: {e}")
+        return 1
+    started = time.monotonic()
+    code = 0
+    try:
+        while not stopped.is_set():
+            if conn.poll(REPORT_INTERVAL):
+                command = conn.recv()
+                if command == "stop":
+                    break
+                if command == "handoff":
+                    # Exit without a close frame so the session stays resumable
+                    conn.send({"type": "handoff", **bot.session_snapshot()})
+                    bot.config.flush()
+                    if bot.recorder is not None:
+                        bot.recorder.close()
+                    os._exit(0)
+            if bot.state.get("gateway_fatal"):
+                code = EXIT_FATAL
+                break
+            now = time.monotonic()
+            sample = bot.metrics.latest
+            last_ack = bot.heartbeat.last_ack
+            conn.send({
+                "type": "report",
+                "pid": os.getpid(),
+                "connected": bot.session_connected,
+                "recv_age": now - (bot.last_recv_at or started),
+                "ack_age": None if last_ack is None else now - last_ack,
+                "rss_mb": sample.get("rss_mb"),
+                "cpu_percent": sample.get("cpu_percent"),
+                **bot.session_snapshot(),
+            })
+    except (OSError, EOFError):
+        # The supervisor is gone, don't linger as an orphan
+        pass
+    finally:
+        server.stop()
+        bot.stop()
+    return code
+
+
+def run_worker(*args):
+    sys.exit(worker_main(*args))
+
+
+class Supervisor:
+    """Runs `worker_main` in a child process and keeps it healthy"""
+
+    def __init__(self, token: str, config_path: Path, socket_path: Path | None = None):
+        self.token = token
+        self.config_path = Path(config_path)
+        self.socket_path = socket_path
+        self.config = ConfigStore.open(self.config_path)
+        self.ctx = multiprocessing.get_context("spawn")
+        self.process = None
+        self.conn = None
+        self.session = {}
+        self.report = None
+        self.report_at = 0.0
+        self.started_at = 0.0
+        self.restarts = Counter()
+        self._cpu_over_since = None
+        self._backoff = 0.0
+        self._stop = threading.Event()
+
+    def _spawn(self):
+        parent, child = self.ctx.Pipe()
+        self.process = self.ctx.Process(
+            target=run_worker,
+            args=(self.token, self.config_path, self.socket_path, dict(self.session) or None, child),
+            name="gateway-worker",
+        )
+        self.process.start()
+        child.close()
+        self.conn = parent
+        self.report = None
+        self.report_at = self.started_at = time.monotonic()
+        self._cpu_over_since = None
+
+    def _remember(self, message: dict):
+        self.report = message
+        self.report_at = time.monotonic()
+        if message.get("session_id"):
+            self.session = {k: message.get(k) for k in SESSION_KEYS}
+        else:
+            # Invalidated, the next worker has to IDENTIFY
+            self.session = {}
+
+    def check(self, now: float) -> str | None:
+        """Reason to replace the worker, or None while it is healthy"""
+        cfg = self.config
+        if now - self.report_at > float(cfg.get("supervisor_report_timeout", 30)):
+            return "unresponsive"
+        r = self.report
+        if r is None:
+            return None
+        if r["recv_age"] > float(cfg.get("supervisor_stall_timeout", 120)):
+            return "stalled"
+        max_rss = float(cfg.get("supervisor_max_rss_mb") or 0)
+        if max_rss and r["rss_mb"] is not None and r["rss_mb"] > max_rss:
+            return "memory"
+        max_cpu = float(cfg.get("supervisor_max_cpu_percent") or 0)
+        if max_cpu and r["cpu_percent"] is not None and r["cpu_percent"] > max_cpu:
+            if self._cpu_over_since is None:
+                self._cpu_over_since = now
+            elif now - self._cpu_over_since >= float(cfg.get("supervisor_cpu_seconds", 60)):
+                return "cpu"
+        else:
+            self._cpu_over_since = None
+        return None
+
+    def restart(self, reason: str):
+        self.restarts[reason] += 1
+        print(f"Restarting gateway worker ({reason})")
+        try:
+            # Ask for the exact sequence; a wedged worker is killed with the last reported one
+            self.conn.send("handoff")
+            deadline = time.monotonic() + 2
+            while self.conn.poll(max(0.0, deadline - time.monotonic())):
+                message = self.conn.recv()
+                self._remember(message)
+                if message.get("type") == "handoff":
+                    break
+        except (OSError, EOFError):
+            pass
+        self._reap(timeout=1)
+
+    def _reap(self, timeout: float):
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(5)
+        self.conn.close()
+
+    def _respawn(self) -> bool:
+        """Start the next worker, backing off while they keep failing young; False if stopped meanwhile"""
+        if time.monotonic() - self.started_at > CRASH_WINDOW:
+            self._backoff = 0.0
+        else:
+            self._backoff = min(60.0, max(1.0, self._backoff * 2))
+        if self._backoff:
+            print(f"Next gateway worker in {self._backoff:.0f}s")
+            if self._stop.wait(self._backoff):
+                return False
+        self._spawn()
+        return True
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self) -> int:
+        self.config.watch()
+        self._spawn()
+        while not self._stop.is_set():
+            try:
+                if self.conn.poll(REPORT_INTERVAL):
+                    self._remember(self.conn.recv())
+            except (OSError, EOFError):
+                # Pipe closed: the worker is exiting
+                self.process.join(REPORT_INTERVAL)
+            if not self.process.is_alive():
+                code = self.process.exitcode
+                self.conn.close()
+                if code == 0:
+                    print("Gateway worker stopped")
+                    return 0
+                if code == EXIT_FATAL:
+                    print("Gateway worker cannot recover, not restarting")
+                    return 1
+                self.restarts["exited"] += 1
+                print(f"Gateway worker exited with status {code}")
+                if not self._respawn():
+                    return 0
+                continue
+            reason = self.check(time.monotonic())
+            if reason:
+                self.restart(reason)
+                if not self._respawn():
+                    return 0
+        try:
+            self.conn.send("stop")
+        except OSError:
+            pass
+        self._reap(timeout=10)
+        return 0
+
+
+def run_supervisor(token: str, config_path: Path, socket_path: Path | None = None) -> int:
+    if not token:
+        print("DISCORD_TOKEN is not set; the supervisor cannot prompt for it")
+        return 1
+    supervisor = Supervisor(token, config_path, socket_path)
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda signum, frame: supervisor.stop())
+    code = supervisor.run()
+    if supervisor.restarts:
+        print("Worker restarts: " + ", ".join(f"{k} {v}" for k, v in supervisor.restarts.items()))
+    return code
+
+
+def main(project_root: Path, socket_path: str | None = None) -> int:
+    return run_supervisor(
+        os.getenv("DISCORD_TOKEN") or "",
+        project_root / "config.json",
+        Path(socket_path) if socket_path else None,
+    )
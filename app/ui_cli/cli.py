@@ -1,13 +1,11 @@
 import os
 import time
-import sys
-import select
 from pathlib import Path
-from dotenv import load_dotenv
-from ..core import DiscordBot
-from ..config import load_config, save_config
-
-load_dotenv()
+from ..core import DiscordBot, IDENTITY_CACHE_NAME
+from ..config import ConfigStore
+from ..identity import IdentityCache
+from ..control import ControlClient, RemoteBot, default_socket_path
+from .screen import Frame, Screen
 
 class Colors:
     RED = '\033[91m'
@@ -23,19 +21,8 @@ class Colors:
     END = '\033[0m'
 
 def clear_screen():
-    os.system('cls' if os.name == 'nt' else 'clear')
-
-def move_cursor_home():
-    """Move cursor to top-left without clearing screen"""
-    print('\033[H', end='')
-
-def move_cursor_to(row, col):
-    """Move cursor to specific row and column (1-indexed)"""
-    print(f'\033[{row};{col}H', end='')
-
-def clear_from_cursor():
-    """Clear from cursor to end of screen"""
-    print('\033[J', end='')
+    # Escape sequence instead of spawning `clear`/`cls`
+    print('\033[2J\033[H', end='', flush=True)
 
 def get_terminal_width():
     """Get terminal width, with fallback to 80"""
@@ -64,9 +51,15 @@ class BotCLI:
     def __init__(self, project_root: Path):
         self.project_root = project_root
         self.config_path = project_root / "config.json"
-        self.config = load_config(self.config_path)
+        # Same store the bot uses, so edits from either side are seen by both
+        self.config = ConfigStore.open(self.config_path)
         self.token = os.getenv("DISCORD_TOKEN") or ""
-        self.bot: DiscordBot | None = None
+        # Shared with DiscordBot.connect(), so a validated token is not fetched twice
+        self.identity = IdentityCache(
+            project_root / IDENTITY_CACHE_NAME, ttl=float(self.config.get("identity_cache_ttl", 3600))
+        )
+        self.bot: DiscordBot | RemoteBot | None = None
+        self.attached = False
 
     def save_token(self, token: str):
         env_path = self.project_root / ".env"
@@ -88,11 +81,11 @@ class BotCLI:
                 print()
                 choice = input(Colors.CYAN + "Select option (1-2): " + Colors.END).strip()
                 if choice == "1":
-                    if DiscordBot.validate_token(current):
+                    if DiscordBot.validate_token(current, cache=self.identity, base=self.config.get("api_url")):
                         return current
                 elif choice == "2":
                     newt = input(Colors.CYAN + "\n(IMPORTANT: Your Discord TOKEN must not be share to anyone, or they can login into your account!)\nEnter your Discord token: " + Colors.END).strip()
-                    if DiscordBot.validate_token(newt):
+                    if DiscordBot.validate_token(newt, cache=self.identity, base=self.config.get("api_url")):
                         self.save_token(newt)
                         self.token = newt
                         return newt
@@ -102,7 +95,7 @@ class BotCLI:
                 print(Colors.RED + "No token found in configuration!" + Colors.END)
                 print()
                 newt = input(Colors.CYAN + "Enter your Discord token: " + Colors.END).strip()
-                if DiscordBot.validate_token(newt):
+                if DiscordBot.validate_token(newt, cache=self.identity, base=self.config.get("api_url")):
                     self.save_token(newt); self.token = newt; return newt
 
     def run(self):
@@ -113,154 +106,136 @@ class BotCLI:
         starting_msg = f"{'Starting bot controller...':^{width}}"
         print(Colors.GREEN + success_msg + Colors.END)
         print(Colors.YELLOW + starting_msg + Colors.END)
-        time.sleep(2)
         self.bot = DiscordBot(token, self.config_path)
-        self.bot.connect()
-        self.bot.start_presence()
+        self.bot.login()
         self.display_panel()
 
-    def display_panel(self):
+    def attach(self, socket_path: str | None = None):
+        """Drive the panel from a daemon started with `--daemon` instead of a local bot"""
+        path = Path(socket_path) if socket_path else default_socket_path(self.config_path)
+        try:
+            self.bot = RemoteBot(ControlClient(path), path=path)
+        except OSError as e:
+            print(Colors.RED + f"No daemon listening on {path}: {e}" + Colors.END)
+            return
+        self.attached = True
+        self.display_panel()
+
+    def compose_panel(self, frame: Frame):
+        """Lay the whole panel out into `frame` from the bot's current state"""
         assert self.bot is not None
-        
-        # Windows-specific imports for non-blocking input
-        if os.name == 'nt':
-            import msvcrt
-        
-        # Initial clear and draw static content
-        clear_screen()
-        print_header()
-        
-        # Calculate positions
-        width = get_terminal_width()
-        available_width = width - 8
-        col_width = available_width // 5
-        
-        # Row positions (adjust based on your header size)
-        session_row = 5
-        table_data_row = 10
-        voice_status_row = 14
-        console_row = 21
-        
-        # Draw static UI elements once
-        print()
-        print()
-        
-        # Draw table structure
-        print(Colors.CYAN + "┌" + "─" * (width - 2) + "┐" + Colors.END)
+        width = frame.width
+        col_width = max(0, (width - 8) // 5)
+        stats = self.bot.get_system_stats()
+        uname = self.bot.username or "unknown"
+
+        frame.put(0, 0, "=" * width, Colors.CYAN)
+        frame.center(1, "DISCORD BOT CONTROLLER", Colors.BOLD + Colors.MAGENTA)
+        frame.put(2, 0, "=" * width, Colors.CYAN)
+
+        session_status = "CONNECTED" if self.bot.session_connected else "DISCONNECTED"
+        status_color = Colors.LIGHT_CYAN if self.bot.session_connected else Colors.RED
+        lat = self.bot.get_latency_stats()
+        if self.bot.session_connected and lat["p50_ms"] is not None:
+            session_status += f" | Latency p50 {lat['p50_ms']:.0f}ms p99 {lat['p99_ms']:.0f}ms"
+        if self.bot.session_connected:
+            session_status += f" | State {self.bot.get_state_footprint() / 1024:.0f} KB"
+        frame.center(4, "[Session: " + session_status + "]", status_color)
+
+        inner = width - 2
         header = f" {'Username':^{col_width}} {'RAM':^{col_width}} {'CPU':^{col_width}} {'Uptime':^{col_width}} {'Voice Channel':^{col_width}}"
-        print(Colors.CYAN + "│" + Colors.BOLD + header[:width-2].ljust(width - 2) + Colors.END + Colors.CYAN + "│" + Colors.END)
-        print(Colors.CYAN + "├" + "─" * (width - 2) + "┤" + Colors.END)
-        print(Colors.CYAN + "│" + " " * (width - 2) + "│" + Colors.END)
-        print(Colors.CYAN + "└" + "─" * (width - 2) + "┘" + Colors.END)
-        print()
-        print(Colors.BOLD + "Use keyboard to select:" + Colors.END)
-        print(Colors.WHITE + "[1] Voice Channel: " + Colors.END)
-        print(Colors.WHITE + "[2] Edit Voice Channel ID" + Colors.END)
-        print(Colors.WHITE + "[3] Edit Status" + Colors.END)
-        print(Colors.WHITE + "[4] Custom Status" + Colors.END)
-        print(Colors.WHITE + "[5] Logout" + Colors.END)
-        print()
-        print(Colors.YELLOW + "[Console]:" + Colors.END)
-        print()
-        print()
-        print(Colors.CYAN + "Press 1-5 to select (refreshing every 1s)..." + Colors.END)
-        
-        while self.bot.monitoring_active:
-            # Update only dynamic values
-            stats = self.bot.get_system_stats()
-            uname = self.bot.username or "unknown"
-            
-            # Update session status
-            session_status = "CONNECTED" if self.bot.session_connected else "DISCONNECTED"
-            status_color = Colors.LIGHT_CYAN if self.bot.session_connected else Colors.RED
-            move_cursor_to(session_row, 1)
-            session_text = f"{'[Session: ' + session_status + ']':^{width}}"
-            print(status_color + session_text + Colors.END)
-            move_cursor_home()
-            
-            # Update table data row
-            move_cursor_to(table_data_row, 2)
-            voice_channel = self.bot.config.get("voice_channel_id", "None")
-            data = f" {uname:^{col_width}} {str(stats['memory_mb']) + ' MB':^{col_width}} {str(stats['cpu_percent']) + '%':^{col_width}} {stats['uptime']:^{col_width}} {voice_channel:^{col_width}}"
-            print(data[:width-2].ljust(width - 2), end='')
-            
-            # Update voice status
-            voice_status = "ON" if self.bot.config.get("auto_join_voice") else "OFF"
-            voice_color = Colors.GREEN if self.bot.config.get("auto_join_voice") else Colors.RED
-            move_cursor_to(voice_status_row, 23)
-            print(voice_color + voice_status + Colors.END + "    ", end='')
-            
-            # Update console status
-            move_cursor_to(console_row, 1)
-            if self.bot.config.get("auto_join_voice") and not self.bot.config.get("voice_channel_id"):
-                print(Colors.RED + "Warning: auto_join_voice is enabled but no voice_channel_id in config.json" + Colors.END + " " * 20)
-            elif self.bot.voice_connected:
-                print(Colors.GREEN + "Voice channel: Connected" + Colors.END + " " * 50)
+        voice_channel = self.bot.config.get("voice_channel_id") or "None"
+        data = f" {uname:^{col_width}} {str(stats['memory_mb']) + ' MB':^{col_width}} {str(stats['cpu_percent']) + '%':^{col_width}} {stats['uptime']:^{col_width}} {voice_channel:^{col_width}}"
+        frame.put(7, 0, "┌" + "─" * inner + "┐", Colors.CYAN)
+        for row, text, style in ((8, header, Colors.BOLD), (10, data, "")):
+            col = frame.put(row, 0, "│", Colors.CYAN)
+            col = frame.put(row, col, text[:inner].ljust(inner), style)
+            frame.put(row, col, "│", Colors.CYAN)
+        frame.put(9, 0, "├" + "─" * inner + "┤", Colors.CYAN)
+        frame.put(11, 0, "└" + "─" * inner + "┘", Colors.CYAN)
+
+        frame.put(13, 0, "Use keyboard to select:", Colors.BOLD)
+        col = frame.put(14, 0, "[1] Voice Channel: ", Colors.WHITE)
+        if self.bot.config.get("auto_join_voice"):
+            frame.put(14, col, "ON", Colors.GREEN)
+        else:
+            frame.put(14, col, "OFF", Colors.RED)
+        last = "[5] Detach" if self.attached else "[5] Logout"
+        for i, label in enumerate(("[2] Edit Voice Channel ID", "[3] Edit Status", "[4] Custom Status", last, "[6] Profile")):
+            frame.put(15 + i, 0, label, Colors.WHITE)
+
+        self.compose_trends(frame, 13, 32)
+
+        frame.put(20, 0, "[Console]:", Colors.YELLOW)
+        if self.bot.config.get("auto_join_voice") and not self.bot.config.get("voice_channel_id"):
+            frame.put(21, 0, "Warning: auto_join_voice is enabled but no voice_channel_id in config.json", Colors.RED)
+        elif self.bot.voice_connected:
+            frame.put(21, 0, "Voice channel: Connected", Colors.GREEN)
+        else:
+            frame.put(21, 0, "Voice channel: Disconnected", Colors.YELLOW)
+        frame.put(23, 0, "Press 1-6 to select...", Colors.CYAN)
+
+    def compose_trends(self, frame: Frame, row: int, col: int):
+        """Sparkline and min/avg/max per sampled metric, beside the menu"""
+        assert self.bot is not None
+        if frame.width - col < 40:
+            return
+        series = self.bot.metrics.series
+        lines = (
+            ("RSS", "rss_mb", "{:.0f}", "MB"),
+            ("CPU", "cpu_percent", "{:.0f}", "%"),
+            ("Threads", "threads", "{:.0f}", ""),
+            ("FDs", "fds", "{:.0f}", ""),
+            ("Latency", "latency_ms", "{:.0f}", "ms"),
+            ("Events/s", "events_per_sec", "{:.1f}", ""),
+        )
+        for i, (label, name, fmt, unit) in enumerate(lines):
+            s = series[name].summary()
+            if s["min"] is None:
+                figures = "-"
             else:
-                print(Colors.YELLOW + "Voice channel: Disconnected" + Colors.END + " " * 50)
-            
-            sys.stdout.flush()
-            
-            # Non-blocking key check
-            try:
-                choice = None
-                if os.name == 'nt':
-                    if msvcrt.kbhit():
-                        choice = msvcrt.getch().decode('utf-8').strip()
-                else:
-                    import termios
-                    import tty
-                    old_settings = termios.tcgetattr(sys.stdin)
-                    try:
-                        tty.setcbreak(sys.stdin.fileno())
-                        rlist, _, _ = select.select([sys.stdin], [], [], 1.0)
-                        if rlist:
-                            choice = sys.stdin.read(1)
-                    finally:
-                        termios.tcsetattr(sys.stdin, termios.TCSADRAIN, old_settings)
-                
-                if choice:
-                    clear_screen()
-                    if choice == "1":
-                        self.toggle_voice_ui()
-                    elif choice == "2":
-                        self.edit_voice_channel_id_ui()
-                    elif choice == "3":
-                        self.edit_status_ui()
-                    elif choice == "4":
-                        self.edit_activity_ui()
-                    elif choice == "5":
-                        self.logout_ui()
-                        break
-                    # Redraw everything after dialog
-                    clear_screen()
-                    print_header()
-                    print()
-                    print()
-                    print(Colors.CYAN + "┌" + "─" * (width - 2) + "┐" + Colors.END)
-                    header = f" {'Username':^{col_width}} {'RAM':^{col_width}} {'CPU':^{col_width}} {'Uptime':^{col_width}} {'Voice Channel':^{col_width}}"
-                    print(Colors.CYAN + "│" + Colors.BOLD + header[:width-2].ljust(width - 2) + Colors.END + Colors.CYAN + "│" + Colors.END)
-                    print(Colors.CYAN + "├" + "─" * (width - 2) + "┤" + Colors.END)
-                    print(Colors.CYAN + "│" + " " * (width - 2) + "│" + Colors.END)
-                    print(Colors.CYAN + "└" + "─" * (width - 2) + "┘" + Colors.END)
-                    print()
-                    print(Colors.BOLD + "Use keyboard to select:" + Colors.END)
-                    print(Colors.WHITE + "[1] Voice Channel: " + Colors.END)
-                    print(Colors.WHITE + "[2] Edit Voice Channel ID" + Colors.END)
-                    print(Colors.WHITE + "[3] Edit Status" + Colors.END)
-                    print(Colors.WHITE + "[4] Custom Status" + Colors.END)
-                    print(Colors.WHITE + "[5] Logout" + Colors.END)
-                    print()
-                    print(Colors.YELLOW + "[Console]:" + Colors.END)
-                    print()
-                    print()
-                    print(Colors.CYAN + "Press 1-5 to select (refreshing every 1s)..." + Colors.END)
-                else:
-                    if os.name == 'nt':
-                        time.sleep(1)
-            except KeyboardInterrupt:
-                self.logout_ui()
-                break
+                figures = "/".join(fmt.format(s[k]) for k in ("min", "avg", "max")) + (" " + unit if unit else "")
+            spark_width = frame.width - col - 10 - 24
+            c = frame.put(row + i, col, f"{label:<9} ", Colors.CYAN)
+            c = frame.put(row + i, c, series[name].sparkline(spark_width).ljust(spark_width), Colors.LIGHT_CYAN)
+            frame.put(row + i, c + 1, figures, Colors.WHITE)
+
+    def display_panel(self):
+        assert self.bot is not None
+        screen = Screen()
+        # Config edits and state changes (connection, voice, stats) repaint straight away
+        self.bot.config.subscribe(lambda changed: screen.wake())
+        unsubscribe = self.bot.state.subscribe(None, lambda key, value, version: screen.wake())
+        actions = {
+            "1": self.toggle_voice_ui,
+            "2": self.edit_voice_channel_id_ui,
+            "3": self.edit_status_ui,
+            "4": self.edit_activity_ui,
+            "6": self.profile_ui,
+        }
+        screen.start()
+        try:
+            while self.bot.monitoring_active:
+                frame = screen.frame()
+                self.compose_panel(frame)
+                screen.render(frame)
+                # Nothing shown changes between uptime ticks unless something wakes us
+                tick = 1 - (time.time() - self.bot.start_time) % 1
+                choice = screen.wait_key(tick)
+                if choice in actions:
+                    with screen.suspend():
+                        actions[choice]()
+                elif choice == "5":
+                    screen.stop()
+                    self.logout_ui()
+                    return
+        except KeyboardInterrupt:
+            screen.stop()
+            self.logout_ui()
+            return
+        finally:
+            unsubscribe()
+        screen.stop()
 
     def toggle_voice_ui(self):
         assert self.bot is not None
@@ -334,7 +309,7 @@ class BotCLI:
         if new_id:
             # Update the config
             self.bot.config["voice_channel_id"] = new_id
-            save_config(self.config_path, self.bot.config)
+            self.bot.config["voice_guild_id"] = ""
             print(Colors.GREEN + "Voice channel ID updated!" + Colors.END)
             
             # If voice is currently enabled, ask to reconnect
@@ -359,7 +334,6 @@ class BotCLI:
         s = input(Colors.CYAN + "Enter new status: " + Colors.END).strip().lower()
         if s in ("online", "idle", "dnd", "invisible"):
             self.bot.config["status"] = s
-            save_config(self.config_path, self.bot.config)
             self.bot.update_presence()
             print(Colors.GREEN + "Status updated!" + Colors.END)
         else:
@@ -372,13 +346,33 @@ class BotCLI:
         print(Colors.CYAN + f"\nCurrent activity: " + Colors.YELLOW + (cur if cur else "None") + Colors.END)
         act = input(Colors.CYAN + "Enter new activity (or empty to clear): " + Colors.END).strip()
         self.bot.config["custom_status"] = act if act else ""
-        save_config(self.config_path, self.bot.config)
         self.bot.update_presence()
         print(Colors.GREEN + "Activity updated!" + Colors.END)
         time.sleep(2)
 
+    def profile_ui(self):
+        assert self.bot is not None
+        print(Colors.CYAN + "\n[1] CPU (cProfile of the gateway thread)" + Colors.END)
+        print(Colors.CYAN + "[2] Memory (tracemalloc growth)" + Colors.END)
+        kind = {"1": "cpu", "2": "memory"}.get(input(Colors.CYAN + "Select option (1-2): " + Colors.END).strip())
+        if kind is None:
+            print(Colors.RED + "Invalid choice!" + Colors.END)
+            time.sleep(1.5)
+            return
+        seconds = input(Colors.CYAN + "Seconds to capture (default 10): " + Colors.END).strip() or "10"
+        try:
+            path = self.bot.start_profile(kind, float(seconds))
+            print(Colors.GREEN + f"Capturing, the report will be written to {path}" + Colors.END)
+        except (ValueError, RuntimeError) as e:
+            print(Colors.RED + f"Could not start profiling: {e}" + Colors.END)
+        time.sleep(2)
+
     def logout_ui(self):
         assert self.bot is not None
+        if self.attached:
+            self.bot.stop()
+            print(Colors.YELLOW + "\nDetached, the daemon keeps running" + Colors.END)
+            return
         self.bot.stop()
         self.bot.leave_voice_channel()
         print(Colors.YELLOW + "\nLogging out...\nPlease run the command again" + Colors.END)
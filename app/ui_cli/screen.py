@@ -0,0 +1,186 @@
+import os
+import sys
+import time
+import select
+import signal
+
+RESET = "\033[0m"
+BLANK = (" ", "")
+
+
+class Frame:
+    """One screen's worth of (char, style) cells, composed before anything is written"""
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.cells = [[BLANK] * width for _ in range(height)]
+
+    def put(self, row: int, col: int, text: str, style: str = "") -> int:
+        """Write `text` at (row, col), clipped to the frame; returns the column after it"""
+        if not 0 <= row < self.height:
+            return col + len(text)
+        line = self.cells[row]
+        for ch in text:
+            if 0 <= col < self.width:
+                line[col] = (ch, style)
+            col += 1
+        return col
+
+    def center(self, row: int, text: str, style: str = ""):
+        self.put(row, max(0, (self.width - len(text)) // 2), text, style)
+
+
+class Screen:
+    """Keeps a model of what is on the terminal and only sends cells that changed.
+
+    `start()` switches to cbreak mode once for the whole session; `suspend()`
+    hands the terminal back for line-based prompts. Each `render()` is a
+    single write to the stream.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.width, self.height = self._size()
+        self.resized = False
+        self.writes = 0
+        self.bytes_written = 0
+        self._front = None
+        self._saved_tty = None
+        self._old_winch = None
+        self._wake_r, self._wake_w = (None, None) if os.name == "nt" else os.pipe()
+        if self._wake_w is not None:
+            # wake() runs on gateway threads and must never block on a full pipe
+            os.set_blocking(self._wake_w, False)
+
+    def _size(self) -> tuple:
+        try:
+            size = os.get_terminal_size(self.stream.fileno())
+            if size.columns and size.lines:
+                return size.columns, size.lines
+        except (OSError, ValueError, AttributeError):
+            pass
+        return 80, 24
+
+    def frame(self) -> Frame:
+        return Frame(self.width, self.height)
+
+    def start(self):
+        if os.name == "nt":
+            # Turns on escape sequence processing in the Windows console
+            os.system("")
+        elif sys.stdin.isatty():
+            import termios
+            import tty
+            self._saved_tty = termios.tcgetattr(sys.stdin)
+            tty.setcbreak(sys.stdin.fileno())
+        if hasattr(signal, "SIGWINCH"):
+            try:
+                self._old_winch = signal.signal(signal.SIGWINCH, self._on_winch)
+            except ValueError:
+                # Not the main thread, resizes are picked up on the next render
+                self._old_winch = None
+        # Hide the cursor and disable autowrap so the bottom-right cell never scrolls
+        self._write("\033[?25l\033[?7l")
+        self._front = None
+
+    def stop(self):
+        self._write(RESET + "\033[?7h\033[?25h\033[2J\033[H")
+        if self._saved_tty is not None:
+            import termios
+            termios.tcsetattr(sys.stdin, termios.TCSADRAIN, self._saved_tty)
+            self._saved_tty = None
+        if self._old_winch is not None:
+            signal.signal(signal.SIGWINCH, self._old_winch)
+            self._old_winch = None
+
+    def suspend(self):
+        """Context manager giving the terminal back for `input()`, repainting fully afterwards"""
+        screen = self
+
+        class _Suspended:
+            def __enter__(self):
+                screen.stop()
+
+            def __exit__(self, *exc):
+                screen.start()
+                return False
+
+        return _Suspended()
+
+    def _on_winch(self, signum, frame):
+        self.resized = True
+        self.wake()
+
+    def wake(self):
+        """Interrupt `wait_key()` from any thread so the caller redraws"""
+        if self._wake_w is not None:
+            try:
+                os.write(self._wake_w, b"\0")
+            except OSError:
+                pass
+
+    def wait_key(self, timeout: float | None) -> str | None:
+        """Block until a key, a `wake()` or the timeout; returns the key if there was one"""
+        if os.name == "nt":
+            import msvcrt
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while deadline is None or time.monotonic() < deadline:
+                if msvcrt.kbhit():
+                    return msvcrt.getwch()
+                if self._size() != (self.width, self.height):
+                    self.resized = True
+                    return None
+                time.sleep(0.05)
+            return None
+        try:
+            rlist, _, _ = select.select([sys.stdin, self._wake_r], [], [], timeout)
+        except InterruptedError:
+            return None
+        if self._wake_r in rlist:
+            os.read(self._wake_r, 512)
+        if sys.stdin in rlist:
+            return sys.stdin.read(1)
+        return None
+
+    def render(self, frame: Frame) -> int:
+        """Send the cells of `frame` that differ from the last one in a single write"""
+        size = self._size()
+        if self.resized or size != (self.width, self.height):
+            self.resized = False
+            self.width, self.height = size
+            self._front = None
+        out = []
+        front = self._front
+        if front is None or len(front) != frame.height or (front and len(front[0]) != frame.width):
+            out.append(RESET + "\033[2J")
+            front = [[BLANK] * frame.width for _ in range(frame.height)]
+        for y, row in enumerate(frame.cells):
+            old = front[y]
+            if row == old:
+                continue
+            first = 0
+            while row[first] == old[first]:
+                first += 1
+            last = len(row) - 1
+            while row[last] == old[last]:
+                last -= 1
+            out.append(f"\033[{y + 1};{first + 1}H")
+            style = None
+            for ch, st in row[first:last + 1]:
+                if st != style:
+                    out.append(RESET + st)
+                    style = st
+                out.append(ch)
+            out.append(RESET)
+        self._front = frame.cells
+        if not out:
+            return 0
+        return self._write("".join(out))
+
+    def _write(self, data: str) -> int:
+        self.stream.write(data)
+        self.stream.flush()
+        self.writes += 1
+        self.bytes_written += len(data)
+        return len(data)
@@ -0,0 +1,99 @@
+import os
+import base64
+import hashlib
+import struct
+
+# RFC 6455 framing helpers shared by the asyncio client and the local mock server
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_CONT = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+
+class ConnectionClosed(Exception):
+    def __init__(self, code: int | None = None, reason: str = ""):
+        super().__init__(f"WebSocket closed ({code}) {reason}".strip())
+        self.code = code
+        self.reason = reason
+
+
+def new_key() -> str:
+    return base64.b64encode(os.urandom(16)).decode("ascii")
+
+
+def accept_key(key: str) -> str:
+    digest = hashlib.sha1((key + WS_GUID).encode("ascii")).digest()
+    return base64.b64encode(digest).decode("ascii")
+
+
+def _apply_mask(payload: bytes, mask: bytes) -> bytes:
+    if not payload:
+        return payload
+    # XOR the whole payload as one big integer instead of byte by byte
+    repeated = (mask * (len(payload) // 4 + 1))[:len(payload)]
+    value = int.from_bytes(payload, "big") ^ int.from_bytes(repeated, "big")
+    return value.to_bytes(len(payload), "big")
+
+
+def encode_frame(opcode: int, payload: bytes, mask: bool = True, fin: bool = True) -> bytes:
+    """Build a single frame, clients must mask and servers must not"""
+    head = bytearray(((0x80 if fin else 0) | opcode,))
+    size = len(payload)
+    mask_bit = 0x80 if mask else 0
+    if size < 126:
+        head.append(mask_bit | size)
+    elif size < 1 << 16:
+        head.append(mask_bit | 126)
+        head += struct.pack(">H", size)
+    else:
+        head.append(mask_bit | 127)
+        head += struct.pack(">Q", size)
+    if mask:
+        key = os.urandom(4)
+        head += key
+        payload = _apply_mask(payload, key)
+    return bytes(head) + payload
+
+
+def close_payload(code: int, reason: str = "") -> bytes:
+    return struct.pack(">H", code) + reason.encode("utf-8")
+
+
+def parse_close(payload: bytes) -> tuple[int | None, str]:
+    if len(payload) < 2:
+        return None, ""
+    return struct.unpack(">H", payload[:2])[0], payload[2:].decode("utf-8", "replace")
+
+
+async def read_frame(reader) -> tuple[bool, int, bytes]:
+    """Read one frame from an asyncio StreamReader, returns (fin, opcode, payload)"""
+    b1, b2 = await reader.readexactly(2)
+    size = b2 & 0x7F
+    if size == 126:
+        size = struct.unpack(">H", await reader.readexactly(2))[0]
+    elif size == 127:
+        size = struct.unpack(">Q", await reader.readexactly(8))[0]
+    key = await reader.readexactly(4) if b2 & 0x80 else None
+    payload = await reader.readexactly(size) if size else b""
+    if key:
+        payload = _apply_mask(payload, key)
+    return bool(b1 & 0x80), b1 & 0x0F, payload
+
+
+async def read_http_head(reader, limit: int = 65536) -> tuple[str, dict]:
+    """Read an HTTP request/status line and headers (lower-cased names)"""
+    raw = await reader.readuntil(b"\r\n\r\n")
+    if len(raw) > limit:
+        raise ValueError("HTTP head too large")
+    lines = raw.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    return lines[0], headers
@@ -0,0 +1,292 @@
+"""Gateway client benchmarks against the local mock server.
+
+    python -m benchmarks.gateway_bench --out results.json
+
+Every run reports the same set of numbers so two JSON files can be diffed
+across versions of `app/core.py`.
+"""
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from app.core import DiscordBot
+from app.codec import get_codec
+from app.mock_server import MockDiscord
+from app.recorder import replay_file
+
+PAYLOAD_SIZES = (256, 4096, 65536, 1048576)
+ROOT = Path(__file__).resolve().parent.parent
+
+# Run in a fresh interpreter so imports are part of the measurement
+COLD_START = """
+import sys, json, time
+from pathlib import Path
+from app.core import DiscordBot
+bot = DiscordBot("bench-token", Path(sys.argv[1]))
+bot.login()
+while not bot.session_connected:
+    time.sleep(0.0005)
+print(json.dumps(bot.get_startup_stats()), flush=True)
+bot.stop()
+"""
+
+
+def wait_for(predicate, timeout: float = 30, interval: float = 0.0005) -> bool:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if predicate():
+            return True
+        time.sleep(interval)
+    return False
+
+
+def make_bot(server: MockDiscord, workdir: Path, **config) -> DiscordBot:
+    cfg = {"gateway_url": server.gateway_url, "api_url": server.api_url, **config}
+    path = workdir / f"config-{len(list(workdir.iterdir()))}.json"
+    path.write_text(json.dumps(cfg), encoding="utf-8")
+    bot = DiscordBot("bench-token", path)
+    bot.connect()
+    bot.start_presence()
+    if not wait_for(lambda: bot.session_connected, 10):
+        raise RuntimeError("Bot never reached READY against the mock server")
+    return bot
+
+
+def bench_throughput(server: MockDiscord, bot: DiscordBot, events: int, size: int) -> dict:
+    start_seq = bot.sequence or 0
+    t0 = time.perf_counter()
+    server.storm(events, size=size)
+    done = wait_for(lambda: (bot.sequence or 0) >= start_seq + events, 120)
+    elapsed = time.perf_counter() - t0
+    return {
+        "events": events,
+        "payload_bytes": size,
+        "completed": done,
+        "seconds": round(elapsed, 4),
+        "events_per_sec": round(events / elapsed, 1),
+    }
+
+
+def bench_decode(codec_names=("json", "orjson", "etf"), sizes=PAYLOAD_SIZES, budget: float = 0.25) -> dict:
+    results = {}
+    for name in codec_names:
+        codec = get_codec(name)
+        per_size = {}
+        for size in sizes:
+            payload = {"t": "MESSAGE_CREATE", "s": 1, "op": 0, "d": {
+                "id": "1", "content": "x" * size, "embeds": [{"n": i} for i in range(8)],
+            }}
+            raw = codec.encode(payload)
+            runs = 0
+            t0 = time.perf_counter()
+            while time.perf_counter() - t0 < budget:
+                codec.decode(raw)
+                runs += 1
+            elapsed = time.perf_counter() - t0
+            peek_runs = 0
+            t1 = time.perf_counter()
+            while time.perf_counter() - t1 < budget:
+                codec.peek(raw)
+                peek_runs += 1
+            peek_elapsed = time.perf_counter() - t1
+            per_size[str(size)] = {
+                "decode_us": round(elapsed / runs * 1e6, 2),
+                "peek_us": round(peek_elapsed / peek_runs * 1e6, 2),
+            }
+        results[codec.name] = per_size
+    return results
+
+
+def bench_reconnect(server: MockDiscord, bot: DiscordBot) -> dict:
+    # Dropped socket -> RESUME -> RESUMED
+    # The down window against a local server is too short to poll for, wait on the counters
+    resumes, reconnects = bot.resume_count, bot.reconnect_count
+    t0 = time.perf_counter()
+    server.drop()
+    resumed = wait_for(lambda: bot.reconnect_count > reconnects and bot.resume_count > resumes and bot.session_connected, 60)
+    resume_s = time.perf_counter() - t0
+
+    # op 7 -> RESUME -> RESUMED
+    resumes = bot.resume_count
+    t0 = time.perf_counter()
+    server.reconnect()
+    op7 = wait_for(lambda: bot.resume_count > resumes and bot.session_connected, 60)
+    op7_s = time.perf_counter() - t0
+
+    # Non-resumable op 9 -> IDENTIFY -> READY
+    old_session = bot.session_id
+    t0 = time.perf_counter()
+    server.invalidate(False)
+    ready = wait_for(lambda: bot.session_id not in (None, old_session) and bot.session_connected, 60)
+    ready_s = time.perf_counter() - t0
+    return {
+        "drop_to_resumed_s": round(resume_s, 4) if resumed else None,
+        "op7_to_resumed_s": round(op7_s, 4) if op7 else None,
+        "op9_to_ready_s": round(ready_s, 4) if ready else None,
+    }
+
+
+def bench_cold_start(server: MockDiscord, workdir: Path, runs: int = 3, **config) -> dict:
+    """Process spawn to READY, first with an empty identity cache and then with a warm one"""
+    startdir = workdir / "cold-start"
+    startdir.mkdir()
+    path = startdir / "config.json"
+    path.write_text(json.dumps({"gateway_url": server.gateway_url, "api_url": server.api_url, **config}), encoding="utf-8")
+    results = {}
+    for label in ("cold", "cached"):
+        samples = []
+        for _ in range(1 if label == "cold" else runs):
+            t0 = time.perf_counter()
+            proc = subprocess.Popen([sys.executable, "-c", COLD_START, str(path)], cwd=ROOT,
+                                    stdout=subprocess.PIPE, text=True)
+            line = proc.stdout.readline()
+            elapsed = time.perf_counter() - t0
+            proc.wait(30)
+            if line:
+                samples.append({"process_to_ready_s": round(elapsed, 4), **json.loads(line)})
+        results[label] = min(samples, key=lambda r: r["process_to_ready_s"]) if samples else None
+    return results
+
+
+def bench_replay(server: MockDiscord, workdir: Path, events: int, **config) -> dict:
+    """Record a dispatch storm, then replay it through decode/dispatch with no network"""
+    path = workdir / "storm.rec"
+    bot = make_bot(server, workdir, record_path=str(path), **config)
+    try:
+        start_seq = bot.sequence or 0
+        server.storm(events, size=200)
+        wait_for(lambda: (bot.sequence or 0) >= start_seq + events, 120)
+    finally:
+        bot.stop()
+    return {
+        "recorded_bytes": sum(p.stat().st_size for p in workdir.glob("storm.rec*")),
+        "skipped": replay_file(path),
+        "handled": replay_file(path, handle=["MESSAGE_CREATE"]),
+    }
+
+
+def bench_send_latency(server: MockDiscord, bot: DiscordBot, samples: int) -> dict:
+    def measure(op, send):
+        latencies = []
+        for _ in range(samples):
+            seen = len(server.received)
+            t0 = time.monotonic()
+            send()
+            if not wait_for(lambda: any(r[1] == op for r in list(server.received)[seen:]), 5):
+                continue
+            arrived = next(r[0] for r in list(server.received)[seen:] if r[1] == op)
+            latencies.append(arrived - t0)
+            # Stay far below the gateway send limit
+            time.sleep(0.01)
+        latencies.sort()
+        if not latencies:
+            return None
+        return {
+            "samples": len(latencies),
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+            "max_ms": round(latencies[-1] * 1000, 3),
+        }
+    return {
+        "op3_presence": measure(3, bot.update_presence),
+        "op4_voice_state": measure(4, lambda: bot.update_voice_state("100000", "1000000000")),
+    }
+
+
+def bench_steady_state(server: MockDiscord, bot: DiscordBot, reconnects: int) -> dict:
+    import psutil
+    proc = psutil.Process()
+    rss_before = proc.memory_info().rss
+    threads_before = threading.active_count()
+    for _ in range(reconnects):
+        resumes = bot.resume_count
+        server.reconnect()
+        wait_for(lambda: bot.resume_count > resumes and bot.session_connected, 60)
+    time.sleep(0.5)
+    return {
+        "reconnects": reconnects,
+        "rss_before_mb": round(rss_before / 1048576, 2),
+        "rss_after_mb": round(proc.memory_info().rss / 1048576, 2),
+        "threads_before": threads_before,
+        "threads_after": threading.active_count(),
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+                             cwd=Path(__file__).resolve().parent)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(args) -> dict:
+    config = {
+        "gateway_engine": args.engine,
+        "gateway_encoding": args.encoding,
+        "gateway_compress": args.compress,
+    }
+    results = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "config": config,
+        },
+        "decode": bench_decode(budget=args.decode_budget),
+    }
+    with tempfile.TemporaryDirectory() as tmp, MockDiscord(heartbeat_interval=args.heartbeat_interval) as server:
+        workdir = Path(tmp)
+        server.rest_latency = args.rest_latency
+        results["cold_start"] = bench_cold_start(server, workdir, **config)
+        bot = make_bot(server, workdir, **config)
+        try:
+            results["throughput"] = {
+                "skipped_events": bench_throughput(server, bot, args.events, 200),
+            }
+            # Register a consumer so every storm event is fully decoded and handled
+            bot.register_dispatch("MESSAGE_CREATE", lambda d: None)
+            results["throughput"]["handled_events"] = bench_throughput(server, bot, args.events, 200)
+            results["reconnect"] = bench_reconnect(server, bot)
+            results["send_latency"] = bench_send_latency(server, bot, args.samples)
+            results["steady_state"] = bench_steady_state(server, bot, args.reconnects)
+        finally:
+            bot.stop()
+        results["replay"] = bench_replay(server, workdir, args.events, **config)
+    if args.replay:
+        # A recording from production, e.g. a dispatch storm, as a repeatable benchmark
+        results["replay_file"] = replay_file(Path(args.replay), handle=args.handle)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--reconnects", type=int, default=20)
+    parser.add_argument("--samples", type=int, default=50)
+    parser.add_argument("--engine", default="thread", choices=("thread", "asyncio"))
+    parser.add_argument("--encoding", default="json", choices=("json", "orjson", "etf"))
+    parser.add_argument("--compress", action="store_true", help="use zlib-stream")
+    parser.add_argument("--heartbeat-interval", type=int, default=41250)
+    parser.add_argument("--rest-latency", type=float, default=0.0, help="seconds the mock adds to every REST response")
+    parser.add_argument("--decode-budget", type=float, default=0.25, help="seconds per decode measurement")
+    parser.add_argument("--replay", help="also replay this traffic recording flat out")
+    parser.add_argument("--handle", action="append", default=[], help="dispatch type to fully decode during --replay")
+    parser.add_argument("--out", help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+    results = run(args)
+    text = json.dumps(results, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 import os
+import sys
+import argparse
 from pathlib import Path
 from dotenv import load_dotenv
 from app.ui_cli.cli import BotCLI
@@ -6,8 +8,23 @@ from app.ui_cli.cli import BotCLI
 def main():
     load_dotenv()
     project_root = Path(__file__).resolve().parent
+    parser = argparse.ArgumentParser(description="Discord 24/7 controller")
+    parser.add_argument("--daemon", action="store_true", help="run headless, controlled over a Unix socket")
+    parser.add_argument("--supervise", action="store_true", help="like --daemon, with the gateway in a worker process that is restarted when it stalls")
+    parser.add_argument("--attach", action="store_true", help="open the panel on a running daemon")
+    parser.add_argument("--socket", help="control socket path (default: bot.sock next to config.json)")
+    args = parser.parse_args()
+    if args.supervise:
+        from app.supervisor import main as supervisor_main
+        sys.exit(supervisor_main(project_root, args.socket))
+    if args.daemon:
+        from app.daemon import main as daemon_main
+        sys.exit(daemon_main(project_root, args.socket))
     cli = BotCLI(project_root)
-    cli.run()
+    if args.attach:
+        cli.attach(args.socket)
+    else:
+        cli.run()
 
 if __name__ == "__main__":
     main()
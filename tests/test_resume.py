@@ -0,0 +1,66 @@
+"""Resume behaviour against the local mock server.
+
+    python -m unittest discover tests
+"""
+import json
+import tempfile
+import unittest
+import importlib.util
+from pathlib import Path
+from app.core import DiscordBot
+from app.mock_server import MockDiscord, MOCK_USER
+from benchmarks.gateway_bench import wait_for
+
+ENGINES = ["asyncio"] + (["thread"] if importlib.util.find_spec("websocket") else [])
+
+
+class ResumeTest(unittest.TestCase):
+    def setUp(self):
+        self.server = MockDiscord().start()
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def start_bot(self, engine: str) -> DiscordBot:
+        path = Path(self.tmp.name) / f"config-{engine}.json"
+        path.write_text(json.dumps({
+            "gateway_url": self.server.gateway_url,
+            "api_url": self.server.api_url,
+            "gateway_engine": engine,
+        }), encoding="utf-8")
+        bot = DiscordBot("test-token", path)
+        self.addCleanup(bot.stop)
+        # Skip /users/@me, the gateway is what is under test
+        bot.identity.put("test-token", MOCK_USER)
+        bot.connect()
+        bot.start_presence()
+        self.assertTrue(wait_for(lambda: bot.session_connected, 10))
+        return bot
+
+    def test_op7_resumes_without_identify(self):
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                self.server.stats.clear()
+                bot = self.start_bot(engine)
+                resumes = bot.resume_count
+                self.server.reconnect()
+                self.assertTrue(wait_for(lambda: bot.resume_count > resumes and bot.session_connected, 10))
+                self.assertEqual(self.server.stats["resumes"], 1)
+                self.assertEqual(self.server.stats["op:2"], 1)
+                bot.stop()
+
+    def test_normal_close_invalidates_session(self):
+        bot = self.start_bot("asyncio")
+        session_id = bot.session_id
+        resumes = bot.resume_count
+        # What the client used to send before every RESUME
+        bot.ws.close(1000)
+        self.assertTrue(wait_for(lambda: bot.session_id not in (None, session_id) and bot.session_connected, 10))
+        self.assertEqual(bot.resume_count, resumes)
+        self.assertEqual(self.server.stats["resumes"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()